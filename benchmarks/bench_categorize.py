@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""Benchmark: per-row extract_category apply vs. the vectorized categorizer.
+
+The vectorized categorizer works on the distinct design numbers, so its
+speedup depends on how many rows share each design.  Each case is labelled
+with its row count and number of distinct designs, and timings are the best
+of ``--repeat`` runs.  Without arguments a small grid of sizes is measured;
+pass ``rows`` (and optionally ``--distinct``) to measure a single case.
+
+Run with ``python benchmarks/bench_categorize.py [rows] [--distinct N] [--repeat N]``.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from categorize import CATEGORIES, categorize_design_numbers, design_prefix, extract_category  # noqa: E402
+
+# (rows, distinct designs) measured when no size is given
+DEFAULT_CASES = [(10000, 1000), (100000, 1000), (100000, 20000), (300000, 1000), (300000, 20000)]
+
+
+# Function to build synthetic design numbers shaped like the inventory sheets
+def make_design_numbers(rows, distinct=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    prefixes = np.array(CATEGORIES + ["XX", "SP-CM", "ZZ"])
+    pool = [f"{rng.choice(prefixes)}-{rng.integers(1, 99999)}" for _ in range(distinct)]
+    return pd.Series(rng.choice(pool, rows))
+
+
+# Function to time a callable, returning (best seconds over repeat runs, result)
+def timed(func, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+# Function to measure one (rows, distinct) case, checking both paths agree
+def run_case(rows, distinct, repeat):
+    design_nos = make_design_numbers(rows, distinct)
+    distinct = design_nos.nunique()
+
+    apply_time, expected = timed(lambda: design_nos.astype(str).apply(extract_category), repeat)
+    vector_time, actual = timed(lambda: categorize_design_numbers(design_nos), repeat)
+    assert (actual.astype(str) == expected).all(), "vectorized categories differ from apply"
+
+    split_time, split_expected = timed(
+        lambda: design_nos.apply(lambda x: x.split('-')[0] if pd.notna(x) else 'Unknown'), repeat)
+    prefix_time, prefixes = timed(lambda: design_prefix(design_nos), repeat)
+    assert (prefixes.astype(str) == split_expected).all(), "vectorized prefixes differ from apply"
+
+    print(f"{rows:>8} {distinct:>9} {apply_time * 1000:9.1f}ms {vector_time * 1000:9.1f}ms {apply_time / vector_time:6.1f}x"
+          f" {split_time * 1000:9.1f}ms {prefix_time * 1000:9.1f}ms {split_time / prefix_time:6.1f}x")
+
+
+def main(cases, repeat=3):
+    print(f"best of {repeat} runs; speedup = apply time / vectorized time")
+    print(f"{'rows':>8} {'distinct':>9} {'apply':>11} {'vectorized':>11} {'speedup':>7}"
+          f" {'split':>11} {'prefix':>11} {'speedup':>7}")
+    for rows, distinct in cases:
+        run_case(rows, distinct, repeat)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("rows", nargs="?", type=int)
+    parser.add_argument("--distinct", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    main([(args.rows, args.distinct)] if args.rows else DEFAULT_CASES, args.repeat)
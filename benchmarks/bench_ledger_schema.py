@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""Benchmark: default-dtype vs. schema-typed monthly sales ledgers.
+
+Writes a synthetic monthly sales CSV and loads it with default dtypes and
+through ``ledger_schema.MONTHLY_SALE``.  Reports load time and frame memory,
+then times the dashboards' groupby sums on the plain text keys and on the
+categorical keys (``observed=True``), checking the sums agree.  Finally
+checks that the export cube rolled up from a ``ledger_schema.EXPORT_SALE``
+load matches plain groupbys of the default-dtype load, keys and order
+included, for both a CSV and an Excel upload.
+
+Run with ``python benchmarks/bench_ledger_schema.py [rows]``.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_sales_summary import make_csv  # noqa: E402
+from export_cube import build_cube, rollup  # noqa: E402
+from ledger_schema import EXPORT_SALE, MONTHLY_SALE, memory_report, memory_report_text, plain_keys  # noqa: E402
+
+GROUP_KEYS = ['parName', 'CatCd', 'CATEGORY', 'type']
+
+
+# Function to return the best wall time of a few runs and the last result
+def best_time(func, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main(rows=1000000):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'monthly_sales.csv')
+        make_csv(path, rows)
+        print(f"{rows} rows, {os.path.getsize(path) / 2**20:.1f} MiB CSV")
+
+        seconds, default = best_time(lambda: pd.read_csv(path, parse_dates=['DocDate']), repeat=1)
+        print(f"{'default load':<16} {seconds:7.2f}s  {default.memory_usage(deep=True).sum() / 2**20:8.1f} MiB")
+
+        def load_typed():
+            with open(path, 'rb') as f:
+                return MONTHLY_SALE.read(f, is_csv=True)
+
+        seconds, typed = best_time(load_typed, repeat=1)
+        print(f"{'schema load':<16} {seconds:7.2f}s  {typed.memory_usage(deep=True).sum() / 2**20:8.1f} MiB")
+        print(memory_report_text(memory_report(typed)))
+
+    print(f"\n{'groupby sum':<12} {'default':>9} {'categorical':>12} {'speedup':>8}")
+    for key in GROUP_KEYS:
+        plain_seconds, expected = best_time(lambda: default.groupby(key)['weight'].sum())
+        typed_seconds, result = best_time(lambda: typed.groupby(key, observed=True)['weight'].sum())
+        result = plain_keys(result.reset_index()).set_index(key)['weight']
+        pd.testing.assert_series_equal(expected, result, check_exact=False, check_index_type=False)
+        print(f"{key:<12} {plain_seconds * 1000:7.1f}ms {typed_seconds * 1000:10.1f}ms {plain_seconds / typed_seconds:7.1f}x")
+
+    keys = ['parName', 'CatCd']
+    plain_seconds, _ = best_time(lambda: default.groupby(keys)['weight'].sum())
+    typed_seconds, _ = best_time(lambda: typed.groupby(keys, observed=True)['weight'].sum())
+    print(f"{'+'.join(keys):<12} {plain_seconds * 1000:7.1f}ms {typed_seconds * 1000:10.1f}ms {plain_seconds / typed_seconds:7.1f}x")
+    assert np.isclose(default['weight'].sum(), typed['weight'].sum())
+
+    check_export_rollups()
+
+
+# Function to write a small export ledger with numeric SIZE and DESIGN NO codes
+def make_export_frame(rows=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'DATE': pd.to_datetime('2024-01-01') + pd.to_timedelta(rng.integers(0, 365, rows), unit='D'),
+        'PARTY': rng.choice([f"PARTY {i}" for i in range(40)], rows),
+        'TYPE': rng.choice(['RING', 'CHAIN', 'BANGLE'], rows),
+        'SIZE': rng.choice([6, 8, 10, 12, 14, 16], rows),
+        'DESIGN NO': rng.choice(['101', '95', '7', '300'], rows),
+        'WEIGHT': rng.gamma(2.0, 5.0, rows).round(3),
+        'QTY': rng.integers(1, 20, rows),
+    })
+
+
+# Function to check that cube rollups of a schema load match groupbys of the default load
+def check_export_rollups():
+    frame = make_export_frame()
+    with tempfile.TemporaryDirectory() as directory:
+        for is_csv, name in ((True, 'export.csv'), (False, 'export.xlsx')):
+            path = os.path.join(directory, name)
+            if is_csv:
+                frame.to_csv(path, index=False)
+                default = pd.read_csv(path, parse_dates=['DATE'])
+            else:
+                frame.to_excel(path, index=False)
+                default = pd.read_excel(path)
+            with open(path, 'rb') as f:
+                cube = build_cube(EXPORT_SALE.read(f, is_csv=is_csv))
+
+            for dimension in ['PARTY', 'TYPE', 'SIZE', 'DESIGN NO', 'DATE']:
+                expected = default.groupby(dimension)[['WEIGHT', 'QTY']].sum().reset_index()
+                result = rollup(cube, dimension, ['WEIGHT', 'QTY']).reset_index(drop=True)
+                # Same keys in the same order; sums agree up to float32 storage of WEIGHT
+                assert list(result[dimension]) == list(expected[dimension]), (name, dimension)
+                assert np.allclose(result['WEIGHT'], expected['WEIGHT']), (name, dimension)
+                assert (result['QTY'] == expected['QTY']).all(), (name, dimension)
+            print(f"export cube rollups match the default-dtype load ({'CSV' if is_csv else 'Excel'})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("rows", nargs="?", type=int, default=1000000)
+    args = parser.parse_args()
+    main(args.rows)
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""Benchmark: per-row FPDF report vs. the streaming column-wise report writer.
+
+Reports aged rows rendered per second and peak traced memory for each
+renderer, plus the time of a cached re-render of the same snapshot.  The two
+renderers lay out a different number of rows per page (the FPDF baseline
+uses one 10 mm cell per row, the table writer packs rows tighter), so page
+counts are shown for reference only and the comparison is made on rows/sec
+for the same rows.  The FPDF baseline is slow, so it runs on at most
+``--legacy-rows`` rows and is skipped with ``--legacy-rows 0``.
+
+Run with ``python benchmarks/bench_report.py [rows]``.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aged_stock import AgedStockIndex  # noqa: E402
+from categorize import CATEGORIES, categorize_design_numbers  # noqa: E402
+from inventory_report import cached_report, generate_pdf_report  # noqa: E402
+
+
+# Function to build a synthetic inventory sheet where most rows are aged
+def make_sheet(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'DATE': pd.Timestamp.today().normalize() - pd.to_timedelta(rng.integers(0, 400, rows), unit='D'),
+        'DESIGN NO': [f"{c}-{n}" for c, n in zip(rng.choice(CATEGORIES, rows), rng.integers(1, 99999, rows))],
+        'WT': rng.random(rows).round(3) * 50,
+        'DELIVERED': rng.choice(['in', 'out'], rows, p=[0.9, 0.1]),
+    })
+    df['CATEGORY'] = categorize_design_numbers(df['DESIGN NO'])
+    return df
+
+
+# Function to render the report the old way: one FPDF cell per row, encoded in memory
+def legacy_fpdf_report(aged_index, aged_days=10):
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", size=10)
+    for _, row in aged_index.aged(aged_days).iterrows():
+        pdf.cell(200, 10, txt=f"Design No: {row['DESIGN NO']}, Category: {row['CATEGORY']}, Weight: {row['WT']}, Age: {row['AGE']} days", ln=True)
+    return pdf.output(dest='S').encode('latin-1'), pdf.page_no()
+
+
+# Function to time a callable, then rerun it under tracemalloc; returns (seconds, peak bytes, result)
+def measure(func):
+    # tracemalloc slows allocation-heavy code down a lot, so timing and memory are separate runs
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak, result
+
+
+# Function to count the pages of a rendered PDF
+def page_count(data):
+    from PyPDF2 import PdfReader
+
+    return len(PdfReader(BytesIO(data)).pages)
+
+
+def report(label, seconds, peak, rows, pages):
+    memory = f"peak {peak / 2**20:8.1f} MiB" if peak else ""
+    print(f"{label:<22} {seconds:8.2f}s  {rows / seconds:9.0f} rows/s  {memory:<18} ({rows} rows, {pages} pages)")
+    return rows / seconds
+
+
+def main(rows=100000, legacy_rows=5000):
+    sales_df, factory_df = make_sheet(rows // 2, seed=1), make_sheet(rows - rows // 2, seed=2)
+    aged_index = AgedStockIndex(pd.concat([sales_df, factory_df], ignore_index=True))
+    aged = aged_index.aged_count(10)
+    print(f"{rows} rows, {aged} aged items")
+
+    seconds, peak, data = measure(lambda: generate_pdf_report(sales_df, factory_df, aged_index).getvalue())
+    report("streaming writer", seconds, peak, aged, page_count(data))
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        start = time.perf_counter()
+        data = cached_report("bench", sales_df, factory_df, aged_index, cache_dir=cache_dir)
+        report("cache miss (to disk)", time.perf_counter() - start, 0, aged, page_count(data))
+        seconds, peak, data = measure(lambda: cached_report("bench", sales_df, factory_df, aged_index, cache_dir=cache_dir))
+        report("cache hit", seconds, peak, aged, page_count(data))
+
+    if legacy_rows:
+        small_sales, small_factory = sales_df.head(legacy_rows // 2), factory_df.head(legacy_rows - legacy_rows // 2)
+        small_index = AgedStockIndex(pd.concat([small_sales, small_factory], ignore_index=True))
+        small_aged = small_index.aged_count(10)
+        seconds, peak, (_, pages) = measure(lambda: legacy_fpdf_report(small_index))
+        legacy_rate = report(f"fpdf per-row ({legacy_rows})", seconds, peak, small_aged, pages)
+        seconds, peak, data = measure(lambda: generate_pdf_report(small_sales, small_factory, small_index).getvalue())
+        streaming_rate = report(f"streaming ({legacy_rows})", seconds, peak, small_aged, page_count(data))
+        print(f"speedup on the same {small_aged} aged rows: {streaming_rate / legacy_rate:.1f}x rows/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("rows", nargs="?", type=int, default=100000)
+    parser.add_argument("--legacy-rows", type=int, default=5000)
+    args = parser.parse_args()
+    main(args.rows, args.legacy_rows)
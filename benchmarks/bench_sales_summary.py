@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""Benchmark: in-memory vs. out-of-core monthly sales summaries.
+
+Writes a synthetic monthly sales CSV, then summarizes it the old way (whole
+file in pandas, filter, three groupbys) and with the chunked streaming
+reader.  Reports time and peak traced memory for each and checks that the
+streaming summary is identical to the in-memory one.
+
+Run with ``python benchmarks/bench_sales_summary.py [rows]``.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sales_summary import EXCLUDED_CATEGORIES, summarize_csv, summarize_frame  # noqa: E402
+
+
+# Function to write a synthetic monthly sales export to a CSV file
+def make_csv(path, rows, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2024-04-01', periods=365).strftime('%Y-%m-%d').to_numpy()
+    categories = ['RING', 'CHAIN', 'BANGLE', 'PENDANT'] + EXCLUDED_CATEGORIES[:3]
+    pd.DataFrame({
+        'DocDate': dates[rng.integers(0, len(dates), rows)],
+        'type': rng.choice(['SALE', 'RETURN'], rows),
+        'parName': np.array([f"Party {i}" for i in range(2000)])[rng.integers(0, 2000, rows)],
+        'CATEGORY': rng.choice(categories, rows),
+        'CatCd': rng.integers(100, 400, rows),
+        'weight': rng.gamma(2, 5, rows).round(3),
+        'noPcs': rng.integers(1, 20, rows),
+    }).to_csv(path, index=False)
+
+
+# Function to summarize the way the dashboards used to: load everything, then group
+def in_memory(path):
+    data = pd.read_csv(path, parse_dates=['DocDate'])
+    return summarize_frame(data)
+
+
+# Function to stream the CSV in chunks
+def streaming(path):
+    with open(path, 'rb') as f:
+        return summarize_csv(f)
+
+
+# Function to time a callable, then rerun it under tracemalloc; returns (seconds, peak bytes, result)
+def measure(func):
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak, result
+
+
+def report(label, seconds, peak):
+    print(f"{label:<12} {seconds:8.2f}s  peak {peak / 2**20:8.1f} MiB")
+
+
+def main(rows=2000000):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'monthly_sales.csv')
+        make_csv(path, rows)
+        print(f"{rows} rows, {os.path.getsize(path) / 2**20:.1f} MiB CSV")
+
+        seconds, peak, expected = measure(lambda: in_memory(path))
+        report("in-memory", seconds, peak)
+        seconds, peak, streamed = measure(lambda: streaming(path))
+        report("streaming", seconds, peak)
+
+    for name in ('party_weight', 'category_weight', 'weight_over_time'):
+        pd.testing.assert_series_equal(getattr(expected, name), getattr(streamed, name), check_exact=True)
+    assert (expected.total_weight, expected.rows) == (streamed.total_weight, streamed.rows)
+    print("streaming summary identical to in-memory summary")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("rows", nargs="?", type=int, default=2000000)
+    args = parser.parse_args()
+    main(args.rows)
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""Vectorized design-number categorization for the inventory apps.
+
+``extract_category`` returns the first category, in list order, that occurs
+anywhere in a design number; "SP" is listed before "SPE", so "SPE" designs are
+reported as "SP".  A regex alternation would return the *leftmost* match in
+the string instead, which differs for designs such as "SP-CM12", so the
+vectorized version keeps list order with ``np.select`` over one
+``str.contains`` pass per category.  Each pass only runs over the distinct
+design numbers, which are far fewer than the rows, and uses Arrow string
+kernels when pyarrow is installed.
+"""
+
+import numpy as np
+import pandas as pd
+
+CATEGORIES = ["CM", "CL", "CN", "CZ", "EX", "FR", "FS", "GL", "GT", "OP", "PL", "LN", "LO", "MD", "MV", "NA", "SP", "SPE", "UN"]
+DEFAULT_CATEGORY = "Other"
+
+# Arrow-backed strings run str.contains/str.split in C; fall back to object strings without pyarrow
+try:
+    import pyarrow  # noqa: F401
+    STRING_DTYPE = "string[pyarrow]"
+except ImportError:
+    STRING_DTYPE = object
+
+
+# Function to extract category (scalar reference implementation)
+def extract_category(design_no):
+    for category in CATEGORIES:
+        if category in design_no:
+            return category
+    return DEFAULT_CATEGORY
+
+
+# Function to categorize a column of design numbers into a pandas Categorical
+def categorize_design_numbers(design_nos, categories=CATEGORIES, default=DEFAULT_CATEGORY):
+    codes, uniques = pd.factorize(design_nos.astype(str))
+    uniques = pd.Series(uniques, dtype=STRING_DTYPE)
+    labels = pd.Index(list(dict.fromkeys(list(categories) + [default])))
+    # np.select picks the first true condition, matching the loop's first-match order
+    conditions = [uniques.str.contains(category, regex=False).to_numpy(dtype=bool) for category in categories]
+    unique_codes = np.select(conditions, np.arange(len(categories)), default=labels.get_loc(default))
+    # Missing design numbers factorize to -1 and never match a category
+    row_codes = np.where(codes < 0, labels.get_loc(default), unique_codes[codes] if len(unique_codes) else codes)
+    return pd.Series(pd.Categorical.from_codes(row_codes, categories=labels), index=design_nos.index)
+
+
+# Function to take the design prefix before the first '-' ('Unknown' for missing values)
+def design_prefix(design_nos, missing="Unknown"):
+    codes, uniques = pd.factorize(design_nos)
+    uniques = pd.Series(uniques, dtype=object).astype(str).astype(STRING_DTYPE)
+    labels = pd.Index(uniques.str.split('-', n=1).str[0].astype(object)).append(pd.Index([missing]))
+    # Missing design numbers factorize to -1, which maps to the trailing `missing` label
+    values = labels.take(np.where(codes < 0, len(labels) - 1, codes))
+    return pd.Series(pd.Categorical(values), index=design_nos.index)
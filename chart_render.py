@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""Cached, off-thread rendering of the seaborn dashboard charts.
+
+A chart is described by a plain ``chart_spec`` dict and the (usually small,
+already aggregated) DataFrame it plots.  Rendered images are cached as bytes
+keyed by a hash of the data plus the spec, so Streamlit reruns serve the
+cached PNG instead of drawing the figure again.
+
+Cache misses are drawn on ``matplotlib.figure.Figure`` objects with the Agg
+canvas, never through pyplot, so no figure is left registered in a global
+figure manager, and each figure is cleared as soon as its image is saved.
+When a page needs several new charts, they are rendered in parallel in a
+persistent pool of spawned worker processes; a single miss is drawn inline.
+"""
+
+import atexit
+import hashlib
+import os
+import pickle
+import threading
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from multiprocessing import get_context
+
+import matplotlib
+import matplotlib.style
+import pandas as pd
+import seaborn as sns
+from cycler import cycler
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from data_loader import FrameCache
+
+# Rendered images kept in memory (bytes are sized by the cache's memory budget)
+MAX_CACHED_CHARTS = 256
+CHART_MEMORY_BUDGET_BYTES = 64 * 1024 * 1024
+MAX_RENDER_WORKERS = min(4, os.cpu_count() or 1)
+# Same output settings st.pyplot uses
+DEFAULT_DPI = 200
+
+chart_cache = FrameCache(max_entries=MAX_CACHED_CHARTS, memory_budget=CHART_MEMORY_BUDGET_BYTES)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+# Function to describe a chart; everything that changes the picture belongs in the spec
+def chart_spec(kind, x=None, y=None, title=None, figsize=(6.4, 4.8), theme=None, fmt="png", **options):
+    # theme: None for matplotlib defaults, or a seaborn style name applied like sns.set(style=theme)
+    return dict(kind=kind, x=x, y=y, title=title, figsize=tuple(figsize), theme=theme, fmt=fmt, **options)
+
+
+# Function to get the rc settings for a chart theme, independent of the calling process's global state
+def _theme_rc(theme):
+    if theme is None:
+        return {}
+    rc = dict(sns.axes_style(theme))
+    rc.update(sns.plotting_context("notebook"))
+    rc["axes.prop_cycle"] = cycler(color=sns.color_palette("deep"))
+    return rc
+
+
+# Function to hash a DataFrame's contents (index included) together with a chart spec
+def chart_key(data, spec):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(pickle.dumps((list(map(str, data.columns)), list(map(str, data.dtypes)))))
+    digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    digest.update(repr(sorted(spec.items())).encode("utf-8"))
+    return digest.hexdigest()
+
+
+# Function to draw violins from plot_lod.violin_summary output, styled like seaborn's width-normalized violins
+def _draw_violin_summary(ax, summary, spec):
+    color = sns.desaturate(sns.color_palette()[0], 0.75)
+    groups = list(summary.groupby("position", sort=True))
+    stats = [
+        {
+            "coords": group["coord"].to_numpy(), "vals": group["density"].to_numpy(),
+            "mean": group["median"].iloc[0], "median": group["median"].iloc[0],
+            "min": group["coord"].iloc[0], "max": group["coord"].iloc[-1],
+        }
+        for _, group in groups
+    ]
+    positions = [position for position, _ in groups]
+    if stats:
+        # ax.violin scales each violin to its own peak, which is seaborn's density_norm="width"
+        bodies = ax.violin(stats, positions=positions, widths=0.8, showmeans=False, showextrema=False, showmedians=False)
+        for body in bodies["bodies"]:
+            body.set_facecolor(color)
+            body.set_edgecolor("0.25")
+            body.set_alpha(1)
+        first = summary.groupby("position", sort=True).first()
+        # Inner box: whiskers, interquartile bar and a white median dot
+        ax.vlines(positions, first["whisker_low"], first["whisker_high"], color="0.25", linewidth=1)
+        ax.vlines(positions, first["q1"], first["q3"], color="0.25", linewidth=5)
+        ax.scatter(positions, first["median"], color="white", s=12, zorder=3)
+        ax.set_xticks(positions, labels=[str(label) for label in first[spec["x"]]])
+    ax.set_xlabel(spec["x"])
+    ax.set_ylabel(spec["y"])
+
+
+# Function to draw one chart and return the encoded image (runs in worker processes)
+def render_chart(data, spec):
+    with warnings.catch_warnings(), matplotlib.style.context("default"), matplotlib.rc_context(_theme_rc(spec.get("theme"))):
+        warnings.simplefilter("ignore")
+        fig = Figure(figsize=spec["figsize"])
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        try:
+            kind = spec["kind"]
+            if kind == "bar":
+                sns.barplot(x=spec["x"], y=spec["y"], data=data, palette=spec.get("palette"), ax=ax)
+            elif kind == "line":
+                # series: [(column, legend label or None), ...] drawn on the same axes
+                for column, label in spec.get("series") or [(spec["y"], None)]:
+                    sns.lineplot(x=spec["x"], y=column, data=data, marker=spec.get("marker"),
+                                 color=spec.get("color"), label=label, ax=ax)
+            elif kind == "heatmap":
+                sns.heatmap(data, annot=spec.get("annot", False), cmap=spec.get("cmap"), ax=ax)
+            elif kind == "scatter":
+                sns.scatterplot(x=spec["x"], y=spec["y"], data=data, hue=spec.get("hue"),
+                                palette=spec.get("palette"), ax=ax)
+            elif kind == "violin":
+                sns.violinplot(x=spec["x"], y=spec["y"], data=data, density_norm=spec.get("density_norm", "area"), ax=ax)
+            elif kind == "violin_summary":
+                _draw_violin_summary(ax, data, spec)
+            elif kind == "hexbin":
+                collection = ax.hexbin(data[spec["x"]], data[spec["y"]], gridsize=spec.get("gridsize", 60), mincnt=1,
+                                       bins="log", cmap=spec.get("cmap", "viridis"))
+                fig.colorbar(collection, ax=ax, label="Rows")
+                ax.set_xlabel(spec["x"])
+                ax.set_ylabel(spec["y"])
+            else:
+                raise ValueError(f"Unknown chart kind: {kind}")
+
+            if spec.get("title"):
+                ax.set_title(spec["title"], **spec.get("title_kwargs", {}))
+            if spec.get("xlabel") is not None:
+                ax.set_xlabel(spec["xlabel"])
+            if spec.get("ylabel") is not None:
+                ax.set_ylabel(spec["ylabel"])
+            if spec.get("legend"):
+                ax.legend()
+            if spec.get("xtick_rotation"):
+                ax.tick_params(axis="x", labelrotation=spec["xtick_rotation"])
+
+            output = BytesIO()
+            fig.savefig(output, format=spec["fmt"], dpi=spec.get("dpi", DEFAULT_DPI), bbox_inches="tight")
+            return output.getvalue()
+        finally:
+            fig.clear()
+
+
+# Function to get the shared render pool, starting it on first use
+def _render_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=MAX_RENDER_WORKERS, mp_context=get_context("spawn"))
+        return _pool
+
+
+@atexit.register
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+# Function to get images for several (data, spec) charts, rendering only the cache misses
+def chart_images(charts):
+    keys = [chart_key(data, spec) for data, spec in charts]
+    images = [chart_cache.get(key) for key in keys]
+    misses = [i for i, image in enumerate(images) if image is None]
+
+    if len(misses) == 1 or MAX_RENDER_WORKERS == 1:
+        for i in misses:
+            images[i] = render_chart(*charts[i])
+    elif misses:
+        try:
+            pool = _render_pool()
+            futures = {i: pool.submit(render_chart, *charts[i]) for i in misses}
+            for i, future in futures.items():
+                images[i] = future.result()
+        except BrokenProcessPool:
+            # A worker died (e.g. killed by the OS); start a fresh pool next time and draw inline now
+            shutdown_pool()
+            for i in misses:
+                images[i] = render_chart(*charts[i])
+
+    for i in misses:
+        chart_cache.put(keys[i], images[i])
+    return images
+
+
+# Function to get the image for one chart
+def chart_image(data, spec):
+    return chart_images([(data, spec)])[0]
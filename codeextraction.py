@@ -1,49 +1,43 @@
 # -*- coding: utf-8 -*-
-import re
 import pandas as pd
-from PyPDF2 import PdfReader
 import os
 import streamlit as st
-from io import BytesIO
-
-# Function to extract image codes from a PDF and clean them
-def extract_codes_from_pdf(pdf_file):
-    reader = PdfReader(pdf_file)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text()
-    # Extract and clean codes (remove "IT" prefix)
-    codes = [re.sub(r"^IT", "", code) for code in re.findall(r"(IT[A-Z]+\d+)\.(?:JPG|jpg)", text)]
-    return codes
-
-# Function to append data to an Excel file
-def append_to_excel(data, file_name="Extracted_Data.xlsx"):
-    if os.path.exists(file_name):
-        existing_data = pd.read_excel(file_name)
-        combined_data = pd.concat([existing_data, data], ignore_index=True)
-    else:
-        combined_data = data
-    combined_data.to_excel(file_name, index=False)
+from weight_index import load_weight_index, merge_weights, unmatched_report
+import pdf_code_cache
+import history_store
+from export_formats import xlsx_bytes, XLSX_MIME
+
+# Number of rows shown per page on the View and Download Data page
+PAGE_SIZE_OPTIONS = [100, 500, 1000, 5000]
+
+# Function to append data to the extraction history (one new chunk per batch)
+def append_to_history(data):
+    history_store.migrate_legacy_excel()
+    history_store.append_batch(data)
 
 # Function to merge extracted data with weight sheet
 def merge_with_weight_data(extracted_df, weight_file):
-    weight_df = pd.read_excel(weight_file, sheet_name=0)  # Load weight sheet
-    weight_df.rename(columns=str.strip, inplace=True)  # Remove unwanted spaces from column names
-    
-    # Ensure column names are correct
-    if "Code" not in weight_df.columns or "Category" not in weight_df.columns or "Weight" not in weight_df.columns:
+    # Code lookup index built once per weight sheet and reused across sessions
+    try:
+        index = load_weight_index(weight_file)
+    except ValueError:
         st.error("❌ Weight sheet format is incorrect. Ensure it has 'Code', 'Category', and 'Weight' columns.")
         return extracted_df
-    
-    # Merge extracted data with weight data
-    merged_df = extracted_df.merge(weight_df, on="Code", how="left")
-    return merged_df
+
+    if index.attrs.get("duplicate_codes"):
+        st.warning(f"⚠️ Weight sheet lists {index.attrs['duplicate_codes']} code(s) more than once; the first entry is used.")
+
+    # Report codes that have no entry in the weight sheet
+    unmatched = unmatched_report(extracted_df, index)
+    if not unmatched.empty:
+        with st.expander(f"⚠️ {unmatched['Count'].sum()} code(s) not found in the weight sheet"):
+            st.dataframe(unmatched)
+
+    return merge_weights(extracted_df, index)
 
 # Function to create a download link
 def create_download_link(dataframe):
-    output = BytesIO()
-    dataframe.to_excel(output, index=False, engine="openpyxl")
-    return output.getvalue()
+    return xlsx_bytes([dataframe])
 
 # Streamlit App
 def main():
@@ -72,14 +66,33 @@ def main():
         if uploaded_files and weight_file:
             recent_data = []
 
-            for uploaded_file in uploaded_files:
-                st.write(f"📂 Processing: {uploaded_file.name}")
-                codes = extract_codes_from_pdf(uploaded_file)
-                if codes:
-                    party_name = os.path.splitext(uploaded_file.name)[0]
-                    recent_data.extend([(party_name, code) for code in codes])
+            # Extract all PDFs in parallel and report progress as each file finishes
+            files = [(uploaded_file.name, uploaded_file.getvalue()) for uploaded_file in uploaded_files]
+            progress = st.progress(0.0, text=f"📂 Processing {len(files)} file(s)...")
+            results = [None] * len(files)
+            cache_hits = cache_misses = 0
+            for done, (index, file_name, codes, cache_hit) in enumerate(pdf_code_cache.extract_codes_cached(files), start=1):
+                results[index] = codes
+                if cache_hit:
+                    cache_hits += 1
                 else:
-                    st.warning(f"⚠️ No valid codes found in {uploaded_file.name}")
+                    cache_misses += 1
+                progress.progress(done / len(files), text=f"📂 Processed: {file_name} ({done}/{len(files)})")
+                if not codes:
+                    st.warning(f"⚠️ No valid codes found in {file_name}")
+
+            # Show how many PDFs were served from the code cache
+            st.session_state["cache_hits"] = st.session_state.get("cache_hits", 0) + cache_hits
+            st.session_state["cache_misses"] = st.session_state.get("cache_misses", 0) + cache_misses
+            col1, col2, col3 = st.columns(3)
+            col1.metric("⚡ Cache Hits", cache_hits)
+            col2.metric("🔍 Cache Misses", cache_misses)
+            col3.metric("📈 Session Hit / Miss", f"{st.session_state['cache_hits']} / {st.session_state['cache_misses']}")
+
+            # Keep rows in upload order regardless of which file finished first
+            for (file_name, _), codes in zip(files, results):
+                party_name = os.path.splitext(file_name)[0]
+                recent_data.extend([(party_name, code) for code in codes])
 
             if recent_data:
                 df_recent = pd.DataFrame(recent_data, columns=["Party Name", "Code"])
@@ -92,9 +105,9 @@ def main():
                 st.write("### Extracted Data with Weights:")
                 st.dataframe(merged_df)
 
-                # Append the merged data to the Excel sheet
-                append_to_excel(merged_df)
-                st.success("📊 Data successfully saved in **Extracted_Data.xlsx**!")
+                # Append the merged data to the extraction history
+                append_to_history(merged_df)
+                st.success("📊 Data successfully saved to the extraction history!")
 
                 # Store recent data globally for download
                 st.session_state["recent_data"] = merged_df
@@ -105,33 +118,39 @@ def main():
     # View and Download Data Page
     elif choice == "View and Download Data":
         st.title("📥 View and Download Data")
-        if os.path.exists("Extracted_Data.xlsx"):
-            excel_data = pd.read_excel("Extracted_Data.xlsx")
-            st.write("### Current Data in Excel:")
-            st.dataframe(excel_data)
+        history_store.migrate_legacy_excel()
+        total_rows = history_store.row_count()
+        if total_rows:
+            # Only the chunks behind the visible page are read
+            st.write(f"### Current Data ({total_rows} rows):")
+            page_size = st.selectbox("Rows per page", PAGE_SIZE_OPTIONS)
+            page_count = (total_rows + page_size - 1) // page_size
+            page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1)
+            st.dataframe(history_store.read_page(int(page) - 1, page_size))
 
             # Download options
             st.markdown("#### Download Options:")
             col1, col2 = st.columns(2)
             with col1:
                 if st.button("📥 Download Full Data"):
-                    processed_data = create_download_link(excel_data)
+                    # Workbook is streamed chunk by chunk only when requested
+                    processed_data = xlsx_bytes(history_store.iter_chunks(), columns=history_store.columns())
                     st.download_button(
                         label="Click to Download Full Data",
                         data=processed_data,
                         file_name="Extracted_Data.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                        mime=XLSX_MIME
                     )
 
             with col2:
-                if "recent_data" in st.session_state:
+                if st.session_state.get("recent_data") is not None:
                     recent_data = st.session_state["recent_data"]
                     processed_recent = create_download_link(recent_data)
                     st.download_button(
                         label="Click to Download Recent Data",
                         data=processed_recent,
                         file_name="Recent_Extraction.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                        mime=XLSX_MIME
                     )
                 else:
                     st.warning("⚠️ No recent data available for download.")
@@ -140,9 +159,13 @@ def main():
     elif choice == "Manage Data":
         st.title("🗑️ Manage Data")
         if st.button("🗑️ Clear Old Extraction History"):
-            if os.path.exists("Extracted_Data.xlsx"):
-                os.remove("Extracted_Data.xlsx")
+            history_store.clear()
+            if os.path.exists(history_store.LEGACY_EXCEL):
+                os.remove(history_store.LEGACY_EXCEL)
             st.success("✅ Old extraction history cleared successfully.")
+        if st.button("🧹 Clear PDF Code Cache"):
+            pdf_code_cache.clear()
+            st.success("✅ Cached PDF codes cleared; PDFs will be re-extracted on next upload.")
 
 # Run the app
 if __name__ == "__main__":
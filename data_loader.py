@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""Shared upload ingestion for the sales dashboards.
+
+Uploaded ledgers are parsed once and kept in a process-wide LRU cache keyed on
+the hash of the file contents, so Streamlit reruns (and other dashboards that
+receive the same file) reuse the typed DataFrame instead of re-reading it.
+Uploads that fall out of memory are reloaded from the columnar sidecar store.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+import sidecar_store
+from ledger_schema import memory_report
+
+# Cache limits: number of parsed uploads and total DataFrame memory kept alive
+MAX_ENTRIES = 8
+MEMORY_BUDGET_BYTES = 512 * 1024 * 1024
+HASH_BLOCK_BYTES = 1024 * 1024
+
+
+# Function to hash the contents of an uploaded file
+def file_hash(uploaded_file):
+    uploaded_file.seek(0)
+    digest = hashlib.blake2b(digest_size=16)
+    # Hash in blocks so large uploads are not copied into one bytes object
+    for block in iter(lambda: uploaded_file.read(HASH_BLOCK_BYTES), b""):
+        digest.update(block)
+    uploaded_file.seek(0)
+    return digest.hexdigest()
+
+
+# Function to measure the memory held by a cached value
+def frame_size(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, dict):
+        # Aggregates kept as a dict of frames (e.g. the export cube)
+        return sum(frame_size(item) for item in value.values())
+    return 0
+
+
+class FrameCache:
+    """Bounded LRU cache of parsed DataFrames with a memory budget."""
+
+    def __init__(self, max_entries=MAX_ENTRIES, memory_budget=MEMORY_BUDGET_BYTES):
+        self.max_entries = max_entries
+        self.memory_budget = memory_budget
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][0]
+
+    def put(self, key, value):
+        size = frame_size(value)
+        with self._lock:
+            if key in self._entries:
+                self.total_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.total_bytes += size
+            # Evict least recently used entries, but always keep the newest one
+            while len(self._entries) > 1 and (
+                len(self._entries) > self.max_entries or self.total_bytes > self.memory_budget
+            ):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+
+    def get_or_create(self, key, factory):
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+
+# Process-wide cache shared by every dashboard and rerun
+frame_cache = FrameCache()
+
+
+# Function to parse an uploaded CSV or Excel file
+def read_uploaded_file(uploaded_file):
+    uploaded_file.seek(0)
+    if uploaded_file.name.endswith('.csv'):
+        return pd.read_csv(uploaded_file)
+    return pd.read_excel(uploaded_file)
+
+
+# Function to read the header and first rows of an upload as they are, every column included
+def preview_uploaded_file(uploaded_file, rows=10):
+    uploaded_file.seek(0)
+    reader = pd.read_csv if uploaded_file.name.endswith('.csv') else pd.read_excel
+    preview = reader(uploaded_file, nrows=rows)
+    uploaded_file.seek(0)
+    return preview
+
+
+# Function to load an upload once and serve later reruns from the cache (digest: precomputed file_hash)
+def load_uploaded_file(uploaded_file, parse_dates=None, digest=None, schema=None):
+    # schema: a ledger_schema.LedgerSchema to validate, select and compactly type the columns
+    digest = digest or file_hash(uploaded_file)
+    names = list(parse_dates or ()) + ([schema.key] if schema is not None else [])
+    key = (digest, tuple(names))
+    sidecar_key = "-".join([digest] + names)
+
+    def parse():
+        if schema is not None:
+            data = schema.read(uploaded_file, uploaded_file.name.endswith('.csv'))
+        else:
+            data = read_uploaded_file(uploaded_file)
+        for column in parse_dates or ():
+            if column in data.columns:
+                data[column] = pd.to_datetime(data[column])
+        return data
+
+    def load():
+        # Memory cache first, then the on-disk sidecar, and only then the original file
+        data = sidecar_store.load_or_convert(sidecar_key, parse, categories=schema is not None)
+        if schema is not None:
+            data.attrs["memory_report"] = memory_report(data)
+        return data
+
+    return frame_cache.get_or_create(key, load)
+
+
+# Function to cache a value derived from an upload (summaries, cubes) alongside it
+def load_derived(uploaded_file, name, build):
+    key = (file_hash(uploaded_file), name)
+    return frame_cache.get_or_create(key, build)
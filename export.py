@@ -1,18 +1,19 @@
 # -*- coding: utf-8 -*-
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import streamlit as st
 import warnings
-import io
+from export_dataset import ExportDataset
+from chart_render import chart_spec, chart_image, chart_images
+from plot_lod import SCATTER_MAX_POINTS, VIOLIN_MAX_ROWS
+from ledger_schema import memory_report_text
 
 # Suppress warnings
 warnings.filterwarnings('ignore')
 
 # Streamlit configurations
 st.set_page_config(page_title="Export Sales Analysis", layout="wide")
-sns.set(style="whitegrid")
+# Seaborn theme for every chart (rendered by chart_render, cached across reruns)
+CHART_THEME = "whitegrid"
+TITLE = dict(fontsize=14, fontweight='bold')
 st.title("📊 Export Sales Analysis Dashboard")
 
 # Sidebar for navigation
@@ -27,76 +28,65 @@ menu = st.sidebar.radio(
 uploaded_file = st.sidebar.file_uploader("Upload the Export Sales Excel File", type=['xlsx', 'xls'])
 
 if uploaded_file:
-    # Load data
-    data = pd.read_excel(uploaded_file)
-    data['DATE'] = pd.to_datetime(data['DATE'])
+    # Lazy view of the upload: rows, cube and summaries are computed on first use and cached per upload
+    dataset = ExportDataset(uploaded_file)
 
     # Main Dashboard Content
     if menu == "Upload Data":
         st.write("### Preview of Uploaded Data")
-        st.dataframe(data.head(10))
+        st.dataframe(dataset.preview(10))
 
         st.write("### Data Information")
+        st.caption(memory_report_text(dataset.data.attrs['memory_report']))
         with st.expander("Click to view Data Information"):
-            buffer = io.StringIO()
-            data.info(buf=buffer)
-            info_string = buffer.getvalue()
-            st.text(info_string)
+            st.text(dataset.info_text())
 
     elif menu == "Summary Statistics":
         st.write("### Data Summary")
-        st.write(data.describe())
+        st.write(dataset.describe())
 
         col1, col2 = st.columns(2)
         with col1:
             st.write("#### Statistics for WEIGHT")
-            st.write(data['WEIGHT'].describe())
+            st.write(dataset.describe('WEIGHT'))
         with col2:
             st.write("#### Statistics for QTY")
-            st.write(data['QTY'].describe())
+            st.write(dataset.describe('QTY'))
 
         st.write("### Unique Values in Categorical Columns")
-        st.write(f"Unique Parties: {data['PARTY'].nunique()}")
-        st.write(f"Unique Types: {data['TYPE'].nunique()}")
-        st.write(f"Unique Sizes: {data['SIZE'].nunique()}")
+        st.write(f"Unique Parties: {dataset.unique_count('PARTY')}")
+        st.write(f"Unique Types: {dataset.unique_count('TYPE')}")
+        st.write(f"Unique Sizes: {dataset.unique_count('SIZE')}")
 
     elif menu == "Time-Based Analysis":
         st.write("### Weight and Quantity Over Time")
-        time_summary = data.groupby('DATE').agg({'WEIGHT': 'sum', 'QTY': 'sum'}).reset_index()
-        fig1, ax1 = plt.subplots(figsize=(10, 6))
-        sns.lineplot(x='DATE', y='WEIGHT', data=time_summary, marker='o', label='Weight')
-        sns.lineplot(x='DATE', y='QTY', data=time_summary, marker='o', label='Quantity')
-        ax1.set_title("Weight and Quantity Over Time", fontsize=16, fontweight='bold')
-        plt.xlabel("Date")
-        plt.ylabel("Total")
-        plt.legend()
-        st.pyplot(fig1)
+        time_summary = dataset.rollup('DATE', ['WEIGHT', 'QTY'])
+        st.image(chart_image(time_summary, chart_spec(
+            'line', x='DATE', series=[('WEIGHT', 'Weight'), ('QTY', 'Quantity')], marker='o', xlabel="Date", ylabel="Total", legend=True,
+            title="Weight and Quantity Over Time", title_kwargs=dict(TITLE, fontsize=16), figsize=(10, 6), theme=CHART_THEME)),
+            use_container_width=True)
 
     elif menu == "Party-Based Analysis":
         st.write("### Top and Bottom Parties by Weight")
-        party_summary = data.groupby('PARTY')['WEIGHT'].sum().reset_index()
-        top_10_parties = party_summary.sort_values(by='WEIGHT', ascending=False).head(10)
-        bottom_5_parties = party_summary.sort_values(by='WEIGHT').head(5)
+        top_10_parties, bottom_5_parties = dataset.top_bottom_parties(top=10, bottom=5)
+        top_chart, bottom_chart = chart_images([
+            (top_10_parties, chart_spec('bar', x='WEIGHT', y='PARTY', palette='Blues_r', title="Top 10 Parties by Weight",
+                                        title_kwargs=TITLE, figsize=(8, 6), theme=CHART_THEME)),
+            (bottom_5_parties, chart_spec('bar', x='WEIGHT', y='PARTY', palette='Reds_r', title="Bottom 5 Parties by Weight",
+                                          title_kwargs=TITLE, figsize=(8, 6), theme=CHART_THEME)),
+        ])
 
         col1, col2 = st.columns(2)
         with col1:
             st.write("#### Top 10 Parties")
-            fig2, ax2 = plt.subplots(figsize=(8, 6))
-            sns.barplot(x='WEIGHT', y='PARTY', data=top_10_parties, palette='Blues_r')
-            ax2.set_title("Top 10 Parties by Weight", fontsize=14, fontweight='bold')
-            st.pyplot(fig2)
+            st.image(top_chart, use_container_width=True)
         with col2:
             st.write("#### Bottom 5 Parties")
-            fig3, ax3 = plt.subplots(figsize=(8, 6))
-            sns.barplot(x='WEIGHT', y='PARTY', data=bottom_5_parties, palette='Reds_r')
-            ax3.set_title("Bottom 5 Parties by Weight", fontsize=14, fontweight='bold')
-            st.pyplot(fig3)
+            st.image(bottom_chart, use_container_width=True)
 
     elif menu == "Party Ranking":
         st.write("### Party Ranking by Total Weight")
-        party_summary = data.groupby('PARTY')['WEIGHT'].sum().reset_index()
-        party_summary['Rank'] = party_summary['WEIGHT'].rank(ascending=False, method='min')
-        party_summary = party_summary.sort_values(by='Rank')
+        party_summary = dataset.party_ranking()
 
         st.write("#### Party Ranking Table")
         st.dataframe(party_summary[['Rank', 'PARTY', 'WEIGHT']].style.highlight_max(axis=0, color='lightgreen'))
@@ -109,49 +99,69 @@ if uploaded_file:
 
     elif menu == "Type-Based Analysis":
         st.write("### Type-Based Analysis")
-        type_summary = data.groupby('TYPE').agg({'WEIGHT': 'sum', 'QTY': 'sum'}).reset_index()
-        fig4, ax4 = plt.subplots(figsize=(10, 6))
-        sns.barplot(x='WEIGHT', y='TYPE', data=type_summary, palette='viridis')
-        ax4.set_title("Weight by Type", fontsize=14, fontweight='bold')
-        st.pyplot(fig4)
+        type_summary = dataset.rollup('TYPE', ['WEIGHT', 'QTY'])
+        st.image(chart_image(type_summary, chart_spec(
+            'bar', x='WEIGHT', y='TYPE', palette='viridis', title="Weight by Type", title_kwargs=TITLE, figsize=(10, 6), theme=CHART_THEME)),
+            use_container_width=True)
 
     elif menu == "Size-Based Analysis":
         st.write("### Size-Based Analysis")
-        size_summary = data.groupby('SIZE').agg({'WEIGHT': 'sum'}).reset_index()
-        fig5, ax5 = plt.subplots(figsize=(10, 6))
-        sns.barplot(x='SIZE', y='WEIGHT', data=size_summary, palette='coolwarm')
-        ax5.set_title("Weight by Size", fontsize=14, fontweight='bold')
-        st.pyplot(fig5)
+        size_summary = dataset.rollup('SIZE', ['WEIGHT'])
+        st.image(chart_image(size_summary, chart_spec(
+            'bar', x='SIZE', y='WEIGHT', palette='coolwarm', title="Weight by Size", title_kwargs=TITLE, figsize=(10, 6), theme=CHART_THEME)),
+            use_container_width=True)
 
     elif menu == "Design-Based Analysis":
         st.write("### Top 5 Designs by Weight")
-        design_summary = data.groupby('DESIGN NO')['WEIGHT'].sum().reset_index()
+        design_summary = dataset.rollup('DESIGN NO', ['WEIGHT'])
         top_5_designs = design_summary.sort_values(by='WEIGHT', ascending=False).head(5)
-        fig6, ax6 = plt.subplots(figsize=(8, 6))
-        sns.barplot(x='WEIGHT', y='DESIGN NO', data=top_5_designs, palette='Greens_r')
-        ax6.set_title("Top 5 Designs by Weight", fontsize=14, fontweight='bold')
-        st.pyplot(fig6)
+        st.image(chart_image(top_5_designs, chart_spec(
+            'bar', x='WEIGHT', y='DESIGN NO', palette='Greens_r', title="Top 5 Designs by Weight", title_kwargs=TITLE, figsize=(8, 6), theme=CHART_THEME)),
+            use_container_width=True)
 
     elif menu == "Correlation Analysis":
         st.write("### Correlation Analysis")
-        fig7, ax7 = plt.subplots(figsize=(8, 6))
-        sns.heatmap(data[['WEIGHT', 'QTY']].corr(), annot=True, cmap='coolwarm')
-        ax7.set_title("Correlation Matrix", fontsize=14, fontweight='bold')
-        st.pyplot(fig7)
+        st.image(chart_image(dataset.correlation(), chart_spec(
+            'heatmap', annot=True, cmap='coolwarm', title="Correlation Matrix", title_kwargs=TITLE, figsize=(8, 6), theme=CHART_THEME)),
+            use_container_width=True)
 
     elif menu == "Scatter & Violin Plots":
+        # Level of detail: above the caps, plot a sample / density for the scatter and KDE summaries for the violins
+        with st.expander("Level of detail"):
+            scatter_mode = st.radio("Scatter plot", ["Sampled", "Density (hexbin)", "All rows"], horizontal=True)
+            scatter_cap = st.number_input("Max scatter points", min_value=1000, value=SCATTER_MAX_POINTS, step=1000)
+            violin_cap = st.number_input("Max rows for full violins", min_value=1000, value=VIOLIN_MAX_ROWS, step=1000)
+
+        # Only the plotted columns (or their reductions) are hashed and shipped to the render workers
+        scatter_title = "Weight vs Quantity"
+        if scatter_mode == "Density (hexbin)":
+            scatter = (dataset.data[['WEIGHT', 'QTY']], chart_spec(
+                'hexbin', x='WEIGHT', y='QTY', title=scatter_title, title_kwargs=TITLE, figsize=(8, 6), theme=CHART_THEME))
+        else:
+            scatter_columns = ['WEIGHT', 'QTY', 'TYPE']
+            if scatter_mode == "Sampled" and len(dataset.data) > scatter_cap:
+                scatter_data = dataset.sample(scatter_columns, int(scatter_cap), by='TYPE')
+                scatter_title += f" (sample of {len(scatter_data):,} rows)"
+            else:
+                scatter_data = dataset.data[scatter_columns]
+            scatter = (scatter_data, chart_spec(
+                'scatter', x='WEIGHT', y='QTY', hue='TYPE', palette='tab10', title=scatter_title, title_kwargs=TITLE,
+                figsize=(8, 6), theme=CHART_THEME))
+
+        violin_spec = dict(x='PARTY', y='WEIGHT', xtick_rotation=45, title="Weight Distribution by Party",
+                           title_kwargs=TITLE, figsize=(10, 6), theme=CHART_THEME)
+        if len(dataset.data) > violin_cap:
+            violin = (dataset.violin_summary('PARTY', 'WEIGHT'), chart_spec('violin_summary', **violin_spec))
+        else:
+            violin = (dataset.data[['PARTY', 'WEIGHT']], chart_spec('violin', density_norm='width', **violin_spec))
+
+        scatter_chart, violin_chart = chart_images([scatter, violin])
+
         st.write("### Weight vs Quantity Scatter Plot")
-        fig8, ax8 = plt.subplots(figsize=(8, 6))
-        sns.scatterplot(x='WEIGHT', y='QTY', data=data, hue='TYPE', palette='tab10')
-        ax8.set_title("Weight vs Quantity", fontsize=14, fontweight='bold')
-        st.pyplot(fig8)
+        st.image(scatter_chart, use_container_width=True)
 
         st.write("### Weight Distribution by Party")
-        fig9, ax9 = plt.subplots(figsize=(10, 6))
-        sns.violinplot(x='PARTY', y='WEIGHT', data=data, scale='width')
-        plt.xticks(rotation=45)
-        ax9.set_title("Weight Distribution by Party", fontsize=14, fontweight='bold')
-        st.pyplot(fig9)
+        st.image(violin_chart, use_container_width=True)
 
 else:
     st.info("📂 Please upload a valid Excel file to begin analysis.")
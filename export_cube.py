@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""Precomputed aggregates for the Export Sales Analysis dashboard.
+
+Every section of the dashboard summarizes one dimension at a time (PARTY,
+TYPE, SIZE, DESIGN NO or DATE), so the cube keeps one marginal table per
+dimension, with the WEIGHT and QTY sums and the row count of each key, rather
+than a full groupby over all five dimensions, which has about one group per
+row.  No section crosses two dimensions, so no pair tables are kept.  The
+WEIGHT/QTY correlation is answered from the count, means and centered second
+moments of the paired values, computed in two passes over the rows, which
+avoids the cancellation of the one-pass sum-of-squares formula.
+"""
+
+import numpy as np
+import pandas as pd
+
+from ledger_schema import plain_keys
+
+DIMENSIONS = ['PARTY', 'TYPE', 'SIZE', 'DESIGN NO', 'DATE']
+MEASURES = ['WEIGHT', 'QTY']
+
+
+# Function to build the per-dimension aggregates and the WEIGHT/QTY moments from the export sales data
+def build_cube(data):
+    frame = pd.DataFrame({'WEIGHT': data['WEIGHT'].values, 'QTY': data['QTY'].values, 'ROWS': 1})
+    marginals = {}
+    for dimension in DIMENSIONS:
+        if dimension in data.columns:
+            # Missing keys are dropped, matching a plain groupby on the raw data
+            table = frame.groupby(data[dimension].values, observed=True).sum().rename_axis(dimension)
+            # Categorical keys (schema-loaded ledgers) become plain values, so charts only see observed keys
+            marginals[dimension] = plain_keys(table.reset_index())
+    return dict(marginals=marginals, moments=pair_moments(data['WEIGHT'], data['QTY']))
+
+
+# Function to compute the count, means and centered second moments of the paired WEIGHT and QTY values
+def pair_moments(weight, qty):
+    # Correlation only uses rows where both measures are present, like DataFrame.corr
+    paired = weight.notna() & qty.notna()
+    w = weight[paired].to_numpy(dtype=float)
+    q = qty[paired].to_numpy(dtype=float)
+    n = len(w)
+    mean_w = w.mean() if n else np.nan
+    mean_q = q.mean() if n else np.nan
+    dw = w - mean_w
+    dq = q - mean_q
+    return dict(n=n, mean_w=mean_w, mean_q=mean_q,
+                m2_w=float(dw @ dw), m2_q=float(dq @ dq), c_wq=float(dw @ dq))
+
+
+# Function to read the aggregates of a single dimension from the cube
+def rollup(cube, dimension, measures=MEASURES):
+    return cube['marginals'][dimension][[dimension] + list(measures)].copy()
+
+
+# Function to count the distinct keys of a dimension
+def unique_count(cube, dimension):
+    return len(cube['marginals'][dimension])
+
+
+# Function to rank parties by total weight
+def party_ranking(cube):
+    party_summary = rollup(cube, 'PARTY', ['WEIGHT'])
+    party_summary['Rank'] = party_summary['WEIGHT'].rank(ascending=False, method='min')
+    return party_summary.sort_values(by='Rank')
+
+
+# Function to get the top and bottom parties by weight
+def top_bottom_parties(cube, top=10, bottom=5):
+    party_summary = rollup(cube, 'PARTY', ['WEIGHT'])
+    top_parties = party_summary.sort_values(by='WEIGHT', ascending=False).head(top)
+    bottom_parties = party_summary.sort_values(by='WEIGHT').head(bottom)
+    return top_parties, bottom_parties
+
+
+# Function to build the WEIGHT/QTY correlation matrix from the cube moments
+def correlation(cube):
+    moments = cube['moments']
+    var_w = var_q = 0.0
+    corr = np.nan
+    if moments['n'] > 1:
+        var_w, var_q = moments['m2_w'], moments['m2_q']
+        if var_w > 0 and var_q > 0:
+            corr = float(np.clip(moments['c_wq'] / np.sqrt(var_w * var_q), -1.0, 1.0))
+    # A constant column has no defined correlation, not even with itself
+    diag_w = 1.0 if var_w > 0 else np.nan
+    diag_q = 1.0 if var_q > 0 else np.nan
+    return pd.DataFrame([[diag_w, corr], [corr, diag_q]], index=MEASURES, columns=MEASURES)
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""Lazy view of one Export Sales upload.
+
+``ExportDataset`` is created on every Streamlit rerun, but it does no work up
+front: the parsed rows, the aggregate cube and every summary a section shows
+are computed the first time they are asked for and memoized in the shared
+frame cache under the upload's content hash.  A section only pays for what it
+reads, so light sections (e.g. Party Ranking, which only needs the cube) never
+touch the raw rows once the cube is cached, and switching back to a heavy
+section serves its results from the cache.
+"""
+
+import io
+
+from data_loader import file_hash, frame_cache, load_uploaded_file
+from ledger_schema import EXPORT_SALE
+from export_cube import build_cube, rollup, unique_count, party_ranking, top_bottom_parties, correlation
+from plot_lod import stratified_sample, violin_summary
+
+
+class ExportDataset:
+    """Memoized, on-demand data and summaries for an uploaded export ledger."""
+
+    def __init__(self, uploaded_file, schema=EXPORT_SALE):
+        self.uploaded_file = uploaded_file
+        self.schema = schema
+        self.digest = file_hash(uploaded_file)
+        self._data = None
+
+    def derived(self, name, build):
+        # Value computed once per upload and kept in the shared frame cache
+        return frame_cache.get_or_create((self.digest, name), build)
+
+    @property
+    def data(self):
+        # Rows loaded through the declared schema (served from the cache / sidecar after the first load)
+        if self._data is None:
+            self._data = load_uploaded_file(self.uploaded_file, digest=self.digest, schema=self.schema)
+        return self._data
+
+    @property
+    def cube(self):
+        return self.derived('export_cube', lambda: build_cube(self.data))
+
+    def preview(self, rows=10):
+        return self.derived(('preview', rows), lambda: self.data.head(rows))
+
+    def info_text(self):
+        def build():
+            buffer = io.StringIO()
+            self.data.info(buf=buffer)
+            return buffer.getvalue()
+
+        return self.derived('info', build)
+
+    def describe(self, column=None):
+        # Summary statistics for the whole frame, or for a single column
+        if column is None:
+            return self.derived('describe', lambda: self.data.describe())
+        return self.derived(('describe', column), lambda: self.data[column].describe())
+
+    def unique_count(self, column):
+        # Each cube dimension keeps one row per distinct key, so count there instead of the rows
+        return self.derived(('nunique', column), lambda: unique_count(self.cube, column))
+
+    def rollup(self, dimension, measures):
+        return self.derived(('rollup', dimension, tuple(measures)), lambda: rollup(self.cube, dimension, measures))
+
+    def party_ranking(self):
+        return self.derived('party_ranking', lambda: party_ranking(self.cube))
+
+    def top_bottom_parties(self, top=10, bottom=5):
+        return self.derived(('top_bottom', top, bottom), lambda: top_bottom_parties(self.cube, top=top, bottom=bottom))
+
+    def correlation(self):
+        return self.derived('correlation', lambda: correlation(self.cube))
+
+    def violin_summary(self, x, y):
+        return self.derived(('violin_summary', x, y), lambda: violin_summary(self.data, x, y))
+
+    def sample(self, columns, max_points, by=None):
+        # Stratified sample of the given columns (the columns themselves when under max_points)
+        columns = list(columns)
+        return self.derived(('sample', tuple(columns), max_points, by),
+                            lambda: stratified_sample(self.data[columns], max_points, by=by))
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""Streaming writers for file downloads.
+
+Every writer takes an iterable of DataFrame chunks and writes them to a binary
+file object one chunk at a time, so an export never holds the whole encoded
+file in memory.  Workbooks are written with openpyxl's write-only mode, which
+streams rows to the output instead of building every cell object first.
+"""
+
+import gzip
+import io
+from io import BytesIO
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+EXPORT_CHUNK_ROWS = 50000
+
+
+# Function to convert a cell value to something openpyxl can write
+def _cell_value(value):
+    if value is None:
+        return None
+    if isinstance(value, pd.Timestamp):
+        return None if pd.isna(value) else value.to_pydatetime()
+    try:
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        return value
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+# Function to stream DataFrame chunks into a write-only workbook
+def write_xlsx(frames, fileobj, columns=None, sheet_title="Sheet1"):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_title)
+    header_written = columns is not None
+    if header_written:
+        sheet.append(list(columns))
+    for frame in frames:
+        if not header_written:
+            columns = list(frame.columns)
+            sheet.append(columns)
+            header_written = True
+        frame = frame.reindex(columns=columns)
+        for row in frame.itertuples(index=False, name=None):
+            sheet.append([_cell_value(value) for value in row])
+    if not header_written:
+        sheet.append([])
+    workbook.save(fileobj)
+
+
+# Function to render DataFrame chunks as xlsx bytes for st.download_button
+def xlsx_bytes(frames, columns=None):
+    output = BytesIO()
+    write_xlsx(frames, output, columns=columns)
+    return output.getvalue()
+
+
+# Function to split a DataFrame into row chunks for the streaming writers
+def iter_frame_chunks(df, chunk_rows=EXPORT_CHUNK_ROWS):
+    for start in range(0, max(len(df), 1), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+# Function to stream DataFrame chunks as gzip-compressed CSV
+def write_csv_gz(frames, fileobj, columns=None):
+    # mtime=0 keeps the output identical for identical data
+    with gzip.GzipFile(fileobj=fileobj, mode="wb", mtime=0) as gz:
+        with io.TextIOWrapper(gz, encoding="utf-8", newline="") as text:
+            header = True
+            for frame in frames:
+                if columns is not None:
+                    frame = frame.reindex(columns=columns)
+                frame.to_csv(text, index=False, header=header)
+                header = False
+
+
+# Function to stream DataFrame chunks into a Parquet file, one row group per chunk
+def write_parquet(frames, fileobj, columns=None):
+    writer = None
+    try:
+        for frame in frames:
+            if columns is not None:
+                frame = frame.reindex(columns=columns)
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(fileobj, table.schema)
+            writer.write_table(table.cast(writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+# Download formats: label -> (file extension, MIME type, writer(frames, fileobj))
+EXPORT_FORMATS = {
+    "CSV (gzip)": ("csv.gz", "application/gzip", write_csv_gz),
+    "Parquet": ("parquet", "application/vnd.apache.parquet", write_parquet),
+    "Excel (xlsx)": ("xlsx", XLSX_MIME, write_xlsx),
+}
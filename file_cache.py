@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""Small on-disk cache for rendered files (reports, exports).
+
+Each entry is one file whose name is its cache key.  Files are written to a
+temporary name and renamed into place, so readers never see a partial file,
+and the least recently used entries beyond ``max_files`` are removed.
+"""
+
+import os
+import tempfile
+
+
+# Function to return the path of a cached file, calling write(fileobj) to create it on a miss
+def cached_file(cache_dir, name, write, max_files=20):
+    path = os.path.join(cache_dir, name)
+    if os.path.exists(path):
+        os.utime(path)
+        return path
+
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    evict(cache_dir, max_files)
+    return path
+
+
+# Function to keep only the most recently used files in a cache directory
+def evict(cache_dir, max_files):
+    entries = []
+    for entry in os.listdir(cache_dir):
+        if entry.endswith(".tmp"):
+            continue
+        path = os.path.join(cache_dir, entry)
+        try:
+            entries.append((os.path.getmtime(path), path))
+        except FileNotFoundError:
+            pass
+    entries.sort()
+    for _, path in entries[:max(len(entries) - max_files, 0)]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
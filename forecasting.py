@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""Daily stock forecasts per category with pluggable models.
+
+Rows are first resampled to one total-WT value per calendar day (days with no
+rows count as zero), per category and for all stock together.  Each model is
+a small class with ``fit(y)`` and ``predict(horizon)``; register new ones in
+``MODELS``.  Categories are fitted concurrently, and ``backtest`` scores any
+set of models with rolling-origin evaluation, reporting error and fit time.
+
+Callers cache the fitted forecasts per data snapshot, so a page rerun does no
+fitting unless the sheets changed.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+ALL_KEY = "All"
+DEFAULT_HORIZON = 30
+SEASON_LENGTH = 7
+MAX_FIT_WORKERS = 8
+
+
+class LinearTrend:
+    """Least-squares straight line through the daily series."""
+
+    def fit(self, y):
+        y = np.asarray(y, dtype=float)
+        self.n = len(y)
+        if self.n < 2:
+            self.slope, self.intercept = 0.0, (y[0] if self.n else 0.0)
+        else:
+            self.slope, self.intercept = np.polyfit(np.arange(self.n), y, 1)
+        return self
+
+    def predict(self, horizon):
+        return self.intercept + self.slope * np.arange(self.n, self.n + horizon)
+
+
+class ExponentialSmoothing:
+    """Simple exponential smoothing; alpha is picked by one-step-ahead squared error."""
+
+    ALPHAS = np.linspace(0.05, 0.95, 19)
+
+    def __init__(self, alpha=None):
+        self.alpha = alpha
+
+    def fit(self, y):
+        y = np.asarray(y, dtype=float)
+        alphas = self.ALPHAS if self.alpha is None else np.array([self.alpha])
+        if len(y) == 0:
+            self.level = 0.0
+            return self
+        # Run every candidate alpha at once: one vector update per day
+        level = np.full(len(alphas), y[0])
+        errors = np.zeros(len(alphas))
+        for value in y[1:]:
+            errors += (value - level) ** 2
+            level = level + alphas * (value - level)
+        best = int(np.argmin(errors))
+        self.alpha, self.level = float(alphas[best]), float(level[best])
+        return self
+
+    def predict(self, horizon):
+        return np.full(horizon, self.level)
+
+
+class SeasonalNaive:
+    """Repeats the last full season (a week by default)."""
+
+    def __init__(self, season=SEASON_LENGTH):
+        self.season = season
+
+    def fit(self, y):
+        y = np.asarray(y, dtype=float)
+        self.last_season = y[-self.season:] if len(y) else np.zeros(1)
+        return self
+
+    def predict(self, horizon):
+        return np.resize(self.last_season, horizon)
+
+
+MODELS = {
+    "Linear trend": LinearTrend,
+    "Exponential smoothing": ExponentialSmoothing,
+    "Seasonal naive (weekly)": SeasonalNaive,
+}
+
+
+# Function to resample rows to daily WT totals, per category and overall
+def daily_series(df, category_column='CATEGORY', value_column='WT', date_column='DATE'):
+    values = pd.to_numeric(df[value_column], errors='coerce')
+    valid = df[date_column].notna() & np.isfinite(values) & (values > 0)
+    rows = pd.DataFrame({
+        'day': df.loc[valid, date_column].dt.normalize(),
+        'key': df.loc[valid, category_column].astype(str) if category_column in df.columns else ALL_KEY,
+        'value': values[valid],
+    })
+    if rows.empty:
+        return {}
+    days = pd.date_range(rows['day'].min(), rows['day'].max(), freq='D')
+    # One groupby gives every category's daily totals; missing days become zero
+    table = rows.pivot_table(index='day', columns='key', values='value', aggfunc='sum', fill_value=0)
+    table = table.reindex(days, fill_value=0)
+    series = {ALL_KEY: table.sum(axis=1)}
+    series.update({key: table[key] for key in table.columns})
+    return series
+
+
+# Function to fit one model per series concurrently; returns {key: fitted model}
+def fit_models(series, model_name, max_workers=MAX_FIT_WORKERS):
+    model_class = MODELS[model_name]
+    keys = list(series)
+    with ThreadPoolExecutor(max_workers=min(len(keys), max_workers) or 1) as pool:
+        fitted = pool.map(lambda key: model_class().fit(series[key].to_numpy()), keys)
+        return dict(zip(keys, fitted))
+
+
+# Function to forecast every series, returning a long DataFrame (key, DATE, Predicted WT)
+def forecast(series, model_name, horizon=DEFAULT_HORIZON, max_workers=MAX_FIT_WORKERS):
+    frames = []
+    for key, model in fit_models(series, model_name, max_workers).items():
+        start = series[key].index[-1] + pd.Timedelta(days=1)
+        frames.append(pd.DataFrame({
+            'key': key,
+            'DATE': pd.date_range(start, periods=horizon, freq='D'),
+            'Predicted WT': model.predict(horizon),
+        }))
+    if not frames:
+        return pd.DataFrame(columns=['key', 'DATE', 'Predicted WT'])
+    return pd.concat(frames, ignore_index=True)
+
+
+# Function to score models by rolling-origin backtest: MAE, RMSE and mean fit time per model
+def backtest(series, model_names=None, horizon=DEFAULT_HORIZON, folds=3, min_train=2 * SEASON_LENGTH):
+    model_names = list(model_names or MODELS)
+    results = []
+    for name in model_names:
+        errors, fit_seconds, fits = [], 0.0, 0
+        for values in series.values():
+            y = values.to_numpy(dtype=float)
+            for fold in range(folds, 0, -1):
+                cutoff = len(y) - fold * horizon
+                if cutoff < min_train:
+                    continue
+                start = time.perf_counter()
+                model = MODELS[name]().fit(y[:cutoff])
+                fit_seconds += time.perf_counter() - start
+                fits += 1
+                errors.append(model.predict(horizon)[:len(y) - cutoff] - y[cutoff:cutoff + horizon])
+        errors = np.concatenate(errors) if errors else np.array([np.nan])
+        results.append({
+            'Model': name,
+            'MAE': float(np.mean(np.abs(errors))),
+            'RMSE': float(np.sqrt(np.mean(errors ** 2))),
+            'Fits': fits,
+            'Fit time (ms)': 1000 * fit_seconds / fits if fits else np.nan,
+        })
+    return pd.DataFrame(results).sort_values('MAE', ignore_index=True)
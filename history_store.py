@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""Chunked columnar store for the PDF extraction history.
+
+Every extraction batch is appended as its own Arrow IPC chunk file, so saving a
+batch never rereads or rewrites earlier data.  Readers get row counts from the
+chunk footers and only memory-map the chunks a page of results touches.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.ipc as ipc
+
+HISTORY_DIR = os.environ.get("EXTRACTION_HISTORY_DIR", "Extracted_Data")
+LEGACY_EXCEL = "Extracted_Data.xlsx"
+# Marker file claimed by the session that migrates the legacy workbook
+MIGRATION_MARKER = ".legacy-migration"
+
+
+# Function to list chunk files in append order
+def chunk_paths(directory=HISTORY_DIR):
+    try:
+        names = sorted(name for name in os.listdir(directory) if name.endswith(".arrow"))
+    except FileNotFoundError:
+        return []
+    return [os.path.join(directory, name) for name in names]
+
+
+# Function to convert a batch to Arrow, stringifying mixed-type columns Arrow cannot hold
+def _to_table(data):
+    try:
+        return pa.Table.from_pandas(data, preserve_index=False)
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        data = data.copy()
+        for column in data.columns:
+            if data[column].dtype == object:
+                data[column] = data[column].where(data[column].isna(), data[column].astype(str))
+        return pa.Table.from_pandas(data, preserve_index=False)
+
+
+# Function to append a batch as a new chunk
+def append_batch(data, directory=HISTORY_DIR):
+    os.makedirs(directory, exist_ok=True)
+    table = _to_table(data.reset_index(drop=True))
+    # Time-ordered names keep chunks in append order; the uuid avoids collisions
+    name = f"chunk-{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.arrow"
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    try:
+        feather.write_feather(table, tmp_path, compression="uncompressed")
+        os.replace(tmp_path, os.path.join(directory, name))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# Function to read the row count of a chunk from its footer
+def _chunk_rows(path):
+    with pa.memory_map(path) as source:
+        reader = ipc.open_file(source)
+        return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+
+
+# Function to count the rows in the history without loading it
+def row_count(directory=HISTORY_DIR):
+    return sum(_chunk_rows(path) for path in chunk_paths(directory))
+
+
+# Function to load one chunk as a DataFrame
+def read_chunk(path):
+    return feather.read_table(path, memory_map=True).to_pandas()
+
+
+# Function to iterate over the history one chunk at a time
+def iter_chunks(directory=HISTORY_DIR):
+    for path in chunk_paths(directory):
+        yield read_chunk(path)
+
+
+# Function to list every column that appears in the history, in first-seen order
+def columns(directory=HISTORY_DIR):
+    seen = []
+    for path in chunk_paths(directory):
+        for name in feather.read_table(path, memory_map=True).schema.names:
+            if name not in seen:
+                seen.append(name)
+    return seen
+
+
+# Function to read one page of rows, touching only the chunks it overlaps
+def read_page(page, page_size, directory=HISTORY_DIR):
+    start = page * page_size
+    stop = start + page_size
+    frames = []
+    offset = 0
+    for path in chunk_paths(directory):
+        rows = _chunk_rows(path)
+        if offset + rows > start and offset < stop:
+            chunk = read_chunk(path)
+            frames.append(chunk.iloc[max(start - offset, 0):stop - offset])
+        offset += rows
+        if offset >= stop:
+            break
+    if not frames:
+        return pd.DataFrame()
+    page_df = pd.concat(frames, ignore_index=True)
+    page_df.index = range(start, start + len(page_df))
+    return page_df
+
+
+# Function to import the old single-workbook history as the first chunk
+def migrate_legacy_excel(directory=HISTORY_DIR, legacy_file=LEGACY_EXCEL):
+    if not os.path.exists(legacy_file):
+        return False
+    os.makedirs(directory, exist_ok=True)
+    # Creating the marker with O_EXCL is atomic, so only one session ever runs the import
+    marker = os.path.join(directory, MIGRATION_MARKER)
+    try:
+        os.close(os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        return False
+    try:
+        if chunk_paths(directory):
+            return False
+        append_batch(pd.read_excel(legacy_file), directory)
+        os.replace(legacy_file, legacy_file.replace(".xlsx", ".migrated.xlsx"))
+    except BaseException:
+        # Let a later session retry a failed import
+        os.remove(marker)
+        raise
+    return True
+
+
+# Function to delete the whole history
+def clear(directory=HISTORY_DIR):
+    shutil.rmtree(directory, ignore_errors=True)
@@ -3,50 +3,79 @@
 
 import streamlit as st
 import pandas as pd
-import datetime
-import requests
 import plotly.express as px
-import numpy as np
-from io import BytesIO
-from sklearn.linear_model import LinearRegression
-import schedule
-import time
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import threading
-from fpdf import FPDF  # Import FPDF for PDF generation
+import os
+from sheet_snapshot import SnapshotCache
+from search_index import SearchIndex
+from aged_stock import AgedStockIndex
+from inventory_report import SHEET_SOURCES, AGED_STOCK_DAYS, REPORT_FILENAME, prepare_sheet, cached_report
+import report_worker
+from inventory_metrics import InventoryMetrics
+from export_formats import EXPORT_FORMATS, iter_frame_chunks
+from file_cache import cached_file
+from forecasting import MODELS as FORECAST_MODELS, ALL_KEY as FORECAST_ALL, daily_series, forecast, backtest
+
+# Shared snapshot cache, refreshed in the background for every session
+@st.cache_resource
+def get_snapshot_cache():
+    return SnapshotCache(SHEET_SOURCES, parse=prepare_sheet).start()
+
+# Function to load data from Google Sheets (served from the latest snapshot)
+def load_data():
+    return get_snapshot_cache().get()
+
+# Function to get the inventory frame for a selection, built once per snapshot
+def inventory_frame(option):
+    if option == "Sales Inventory":
+        return sales_df
+    if option == "Factory Inventory":
+        return factory_df
+    return snapshot.derive("combined", lambda: pd.concat([sales_df, factory_df], ignore_index=True))
+
+# Function to get the search index for a selection, rebuilt only when the sheets refresh
+def inventory_search_index(option):
+    # Resolve the (possibly derived) frame first rather than nesting derive calls
+    frame = inventory_frame(option)
+    return snapshot.derive(("search", option), lambda: SearchIndex(frame))
+
+# Function to get the aged-stock index for a selection, built once per snapshot
+def aged_stock_index(option):
+    frame = inventory_frame(option)
+    return snapshot.derive(("aged", option), lambda: AgedStockIndex(frame))
+
+# Function to get the dashboard KPIs, materialized once per snapshot and shared with the report
+def inventory_metrics():
+    return snapshot.derive("metrics", lambda: InventoryMetrics(snapshot.frames))
+
+# Function to get the rows for an Export Data option
+def export_frame(export_option):
+    if export_option == "Overall Inventory":
+        return sales_df
+    if export_option == "Salesperson Inventory":
+        return sales_df[sales_df['CATEGORY'] == "SP"]
+    return factory_df
 
-# Google Sheet URLs
-SALES_SHEET_URL = "https://docs.google.com/spreadsheets/d/1Jwx4TntDxlwghFn_eC_NgooXlpvR6WTDdvWy4PO0zgk/export?format=csv&gid=2076018430"
-FACTORY_SHEET_URL = "https://docs.google.com/spreadsheets/d/1Jwx4TntDxlwghFn_eC_NgooXlpvR6WTDdvWy4PO0zgk/export?format=csv&gid=0"
+# Function to write an export once per snapshot, filter and format, streaming it in chunks
+def cached_export(export_option, export_format):
+    extension, _, writer = EXPORT_FORMATS[export_format]
+    name = f"{snapshot.version}-{export_option.replace(' ', '_')}.{extension}"
+    return cached_file(EXPORT_CACHE_DIR, name, lambda f: writer(iter_frame_chunks(export_frame(export_option)), f))
 
-# Function to load data from Google Sheets
-def load_data():
-    sales_df = pd.read_csv(SALES_SHEET_URL)
-    factory_df = pd.read_csv(FACTORY_SHEET_URL)
-    
-    sales_df['DATE'] = pd.to_datetime(sales_df['DATE'], errors='coerce')
-    factory_df['DATE'] = pd.to_datetime(factory_df['DATE'], errors='coerce')
-    
-    sales_df = sales_df[~sales_df['DELIVERED'].astype(str).str.lower().eq('out')]
-    factory_df = factory_df[~factory_df['DELIVERED'].astype(str).str.lower().eq('out')]
-    
-    return sales_df, factory_df
+# Function to get the daily sales WT series per category, resampled once per snapshot
+def sales_daily_series():
+    return snapshot.derive("sales_daily", lambda: daily_series(sales_df))
 
-# Function to extract category
-def extract_category(design_no):
-    categories = ["CM", "CL", "CN", "CZ", "EX", "FR", "FS", "GL", "GT", "OP", "PL", "LN", "LO", "MD", "MV", "NA", "SP", "SPE", "UN"]
-    for category in categories:
-        if category in design_no:
-            return category
-    return "Other"
+# Function to get the fitted forecast for a model and horizon, cached per snapshot
+def sales_forecast(model_name, horizon):
+    series = sales_daily_series()
+    return snapshot.derive(("forecast", model_name, horizon), lambda: forecast(series, model_name, horizon))
 
-# Load Data
-sales_df, factory_df = load_data()
+# Exports are cached on disk per snapshot, filter and format
+EXPORT_CACHE_DIR = os.environ.get("EXPORT_CACHE_DIR", ".export_cache")
 
-sales_df['CATEGORY'] = sales_df['DESIGN NO'].astype(str).apply(extract_category)
-factory_df['CATEGORY'] = factory_df['DESIGN NO'].astype(str).apply(extract_category)
+# Load Data
+snapshot = load_data()
+sales_df, factory_df = snapshot.frames["sales"], snapshot.frames["factory"]
 
 # Sidebar Navigation
 st.sidebar.title("Navigation")
@@ -67,19 +96,17 @@ if page == "Home":
 elif page == "Dashboard":
     clear_page()
     st.title("Stock Inventory Dashboard")
-    total_sales_weight = sales_df['WT'].sum()
-    total_factory_weight = factory_df['WT'].sum()
-    overall_weight = total_sales_weight + total_factory_weight
+    metrics = inventory_metrics()
     
-    st.metric("Total Sales Weight (WT)", total_sales_weight)
-    st.metric("Total Factory Stock Weight (WT)", total_factory_weight)
-    st.metric("Overall Inventory Weight (WT)", overall_weight)
+    st.metric("Total Sales Weight (WT)", metrics.total('WT', 'sales'))
+    st.metric("Total Factory Stock Weight (WT)", metrics.total('WT', 'factory'))
+    st.metric("Overall Inventory Weight (WT)", metrics.total('WT'))
     
-    category_weight = sales_df.groupby('CATEGORY')['WT'].sum().reset_index()
+    category_weight = metrics.by_category('WT', 'sales').reset_index()
     fig = px.bar(category_weight, x='CATEGORY', y='WT', title="Sales Weight by Category")
     st.plotly_chart(fig)
     
-    sales_trend = sales_df.groupby('DATE')['WT'].sum().reset_index()
+    sales_trend = metrics.over_time('WT', 'sales').reset_index()
     fig2 = px.line(sales_trend, x='DATE', y='WT', title="Sales Trend Over Time")
     st.plotly_chart(fig2)
 
@@ -94,33 +121,24 @@ elif page == "Aged Stock":
     # Add inventory selection option
     inventory_option_aged = st.selectbox("Select Inventory Data for Aged Stock", ["Sales Inventory", "Factory Inventory", "Both"])
     
-    # Filter data based on the selected inventory option
-    if inventory_option_aged == "Sales Inventory":
-        aged_df = sales_df.copy()
-    elif inventory_option_aged == "Factory Inventory":
-        aged_df = factory_df.copy()
-    else:
-        aged_df = pd.concat([sales_df, factory_df], ignore_index=True)
-    
-    # Filter out items marked as "out" (delivered)
-    aged_df = aged_df[~aged_df['DELIVERED'].astype(str).str.lower().eq('out')]
-    
-    # Calculate the age of each item (days since DATE)
-    aged_df['AGE'] = (datetime.datetime.now() - aged_df['DATE']).dt.days
-    
-    # Filter items that have been in inventory for more than 10 days
-    aged_stock = aged_df[aged_df['AGE'] > 10]
+    # Undelivered stock older than the threshold, from the snapshot's date-sorted index (AGE in days)
+    aged_index = aged_stock_index(inventory_option_aged)
+    aged_stock = aged_index.aged(AGED_STOCK_DAYS)
     
-    # Apply search filter (if search query is provided)
+    # Apply search filter (if search query is provided) using the snapshot's search index
     if search_query_aged:
-        aged_stock = aged_stock[aged_stock.astype(str).apply(lambda x: x.str.contains(search_query_aged, case=False, na=False)).any(axis=1)]
+        matching_rows = inventory_search_index(inventory_option_aged).search(search_query_aged)
+        aged_stock = aged_stock[aged_stock.index.isin(inventory_frame(inventory_option_aged).index[matching_rows])]
     
     # Display the aged stock
     st.write(f"Total Aged Stock Items: {len(aged_stock)}")
     
-    # Show a breakdown of aged stock by category
+    # Show a breakdown of aged stock by category (precomputed histogram unless a search narrows it)
     st.write("Aged Stock by Category:")
-    aged_stock_by_category = aged_stock.groupby('CATEGORY').size().reset_index(name='Count')
+    if search_query_aged:
+        aged_stock_by_category = aged_stock.groupby('CATEGORY', observed=True).size().reset_index(name='Count')
+    else:
+        aged_stock_by_category = aged_index.category_counts(AGED_STOCK_DAYS)
     st.dataframe(aged_stock_by_category)
     
     # Display the full aged stock dataframe
@@ -135,17 +153,11 @@ elif page == "Inventory Data":
     search_query = st.text_input("Search Inventory")
 
     inventory_option = st.selectbox("Select Inventory Data", ["Sales Inventory", "Factory Inventory", "Both"])
+    search_index = inventory_search_index(inventory_option)
+    search_columns = st.multiselect("Search in columns (all if empty)", search_index.columns)
     
-    if inventory_option == "Sales Inventory":
-        filtered_df = sales_df[sales_df.astype(str).apply(lambda x: x.str.contains(search_query, case=False, na=False)).any(axis=1)]
-        st.dataframe(filtered_df)
-    elif inventory_option == "Factory Inventory":
-        filtered_df = factory_df[factory_df.astype(str).apply(lambda x: x.str.contains(search_query, case=False, na=False)).any(axis=1)]
-        st.dataframe(filtered_df)
-    else:
-        combined_df = pd.concat([sales_df, factory_df], ignore_index=True)
-        filtered_df = combined_df[combined_df.astype(str).apply(lambda x: x.str.contains(search_query, case=False, na=False)).any(axis=1)]
-        st.dataframe(filtered_df)
+    filtered_df = search_index.filter(search_query, columns=search_columns or None)
+    st.dataframe(filtered_df)
 
 # Export Data Page
 elif page == "Export Data":
@@ -153,177 +165,76 @@ elif page == "Export Data":
     st.title("Export Filtered Data")
     export_option = st.radio("Choose data to export", ["Overall Inventory", "Salesperson Inventory", "Factory Inventory"])
     
-    if export_option == "Overall Inventory":
-        export_df = sales_df
-    elif export_option == "Salesperson Inventory":
-        export_df = sales_df[sales_df['CATEGORY'] == "SP"]
-    else:
-        export_df = factory_df
+    export_format = st.radio("File format", list(EXPORT_FORMATS))
+    extension, mime, _ = EXPORT_FORMATS[export_format]
     
-    csv = export_df.to_csv(index=False).encode('utf-8')
-    st.download_button("Download CSV", data=csv, file_name="Filtered_Inventory.csv", mime='text/csv')
+    # Nothing is encoded until requested; identical snapshot/filter/format requests reuse the cached file
+    if st.button("Prepare Download"):
+        export_path = cached_export(export_option, export_format)
+        with open(export_path, "rb") as f:
+            st.download_button(f"Download {export_format}", data=f.read(), file_name=f"Filtered_Inventory.{extension}", mime=mime)
 
 # Stock Forecast Page
 elif page == "Stock Forecast":
     clear_page()
     st.title("Stock Forecasting")
     
-    # Debug: Display the first few rows of the data
-    st.write("First few rows of the data:", sales_df.head())
-    
-    # Debug: Check for missing values in 'DATE' and 'WT'
-    st.write("Missing values in 'DATE':", sales_df['DATE'].isnull().sum())
-    st.write("Missing values in 'WT':", sales_df['WT'].isnull().sum())
-    
-    # Debug: Check for infinite values in 'WT'
-    st.write("Infinite values in 'WT':", np.isinf(sales_df['WT']).sum())
-    
-    # Clean the data: Drop rows with missing or invalid values
-    sales_df_clean = sales_df.dropna(subset=['DATE', 'WT'])  # Drop rows with missing DATE or WT
-    sales_df_clean = sales_df_clean[sales_df_clean['WT'] > 0]  # Ensure WT is positive
-    
-    # Debug: Display the cleaned data
-    st.write("Cleaned data:", sales_df_clean.head())
-    
-    # Check if there is enough data for forecasting
-    if len(sales_df_clean) == 0:
+    # Daily WT totals per category, resampled once per snapshot
+    series = sales_daily_series()
+    if not series:
         st.error("No valid data available for forecasting.")
     else:
-        # Prepare data for forecasting
-        sales_df_clean['Day'] = (sales_df_clean['DATE'] - sales_df_clean['DATE'].min()).dt.days
-        X = sales_df_clean[['Day']].values  # Convert to NumPy array
-        y = sales_df_clean['WT'].values  # Convert to NumPy array
+        model_name = st.selectbox("Model", list(FORECAST_MODELS))
+        categories = st.multiselect("Categories", list(series), default=[FORECAST_ALL])
+        horizon = st.slider("Days to forecast", min_value=7, max_value=90, value=30, step=1)
         
-        # Debug: Display the shape of X and y
-        st.write("Shape of X:", X.shape)
-        st.write("Shape of y:", y.shape)
+        # Models are fitted (in parallel across categories) only when the snapshot or settings change
+        forecast_df = sales_forecast(model_name, horizon)
+        forecast_df = forecast_df[forecast_df['key'].isin(categories)]
         
-        # Check for finite values in X and y
-        if not np.isfinite(X).all() or not np.isfinite(y).all():
-            st.error("Data contains non-finite values. Please clean the data.")
-        else:
-            # Fit the Linear Regression model
-            model = LinearRegression()
-            model.fit(X, y)
-            
-            # Predict for the next 30 days
-            future_days = np.array([[i] for i in range(X.max() + 1, X.max() + 31)])  # X is now a NumPy array
-            future_predictions = model.predict(future_days)
-            
-            # Debug: Display the future predictions
-            st.write("Future predictions:", future_predictions)
-            
-            # Create a DataFrame for the forecast
-            forecast_df = pd.DataFrame({"Day": future_days.flatten(), "Predicted WT": future_predictions})
-            
-            # Debug: Display the forecast DataFrame
-            st.write("Forecast DataFrame:", forecast_df)
-            
-            # Plot the forecast
-            fig = px.line(forecast_df, x='Day', y='Predicted WT', title="Stock Prediction for Next 30 Days")
-            st.plotly_chart(fig)
+        # Plot the recent history alongside the forecast
+        history = pd.concat(
+            [series[key].tail(90).rename('WT').rename_axis('DATE').reset_index().assign(key=key) for key in categories],
+            ignore_index=True,
+        ) if categories else pd.DataFrame(columns=['DATE', 'WT', 'key'])
+        fig = px.line(history, x='DATE', y='WT', color='key', title=f"Stock Prediction for Next {horizon} Days")
+        for key, group in forecast_df.groupby('key'):
+            fig.add_scatter(x=group['DATE'], y=group['Predicted WT'], mode='lines', line=dict(dash='dash'), name=f"{key} (forecast)")
+        st.plotly_chart(fig)
+        
+        # Backtest every model on the same data
+        with st.expander("Model accuracy (backtest)"):
+            st.dataframe(snapshot.derive(("forecast_backtest", horizon), lambda: backtest(series, horizon=horizon)))
 
 # Reports Page
 elif page == "Reports":
     clear_page()
     st.title("Scheduled and Manual Reports")
 
-    # Function to generate the report as a PDF
-    def generate_pdf_report():
-        # Create a PDF object
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", size=12)
-
-        # Add Dashboard Data to the PDF
-        pdf.cell(200, 10, txt="Dashboard Summary", ln=True, align="C")
-        total_sales_weight = sales_df['WT'].sum()
-        total_factory_weight = factory_df['WT'].sum()
-        overall_weight = total_sales_weight + total_factory_weight
-        pdf.cell(200, 10, txt=f"- Total Sales Weight (WT): {total_sales_weight}", ln=True)
-        pdf.cell(200, 10, txt=f"- Total Factory Stock Weight (WT): {total_factory_weight}", ln=True)
-        pdf.cell(200, 10, txt=f"- Overall Inventory Weight (WT): {overall_weight}", ln=True)
-
-        # Add Aged Stock Data to the PDF
-        pdf.cell(200, 10, txt="Aged Stock Summary", ln=True, align="C")
-        aged_df = pd.concat([sales_df, factory_df], ignore_index=True)
-        aged_df = aged_df[~aged_df['DELIVERED'].astype(str).str.lower().eq('out')]
-        aged_df['AGE'] = (datetime.datetime.now() - aged_df['DATE']).dt.days
-        aged_stock = aged_df[aged_df['AGE'] > 10]
-        pdf.cell(200, 10, txt=f"- Total Aged Stock Items: {len(aged_stock)}", ln=True)
-
-        # Add Aged Stock by Category to the PDF
-        pdf.cell(200, 10, txt="Aged Stock by Category:", ln=True)
-        aged_stock_by_category = aged_stock.groupby('CATEGORY').size().reset_index(name='Count')
-        for _, row in aged_stock_by_category.iterrows():
-            pdf.cell(200, 10, txt=f"- {row['CATEGORY']}: {row['Count']}", ln=True)
-
-        # Add the entire Aged Stock Data to the PDF
-        pdf.cell(200, 10, txt="Full Aged Stock Data:", ln=True, align="C")
-        pdf.set_font("Arial", size=10)
-        for _, row in aged_stock.iterrows():
-            pdf.cell(200, 10, txt=f"Design No: {row['DESIGN NO']}, Category: {row['CATEGORY']}, Weight: {row['WT']}, Age: {row['AGE']} days", ln=True)
-
-        # Save the PDF to a BytesIO object
-        pdf_output = BytesIO()
-        pdf_output.write(pdf.output(dest='S').encode('latin-1'))  # Write PDF content to BytesIO
-        pdf_output.seek(0)
-        return pdf_output
+    # Report rendering is shared with report_worker.py, which delivers the scheduled reports
+    def build_report():
+        return cached_report(snapshot.version, sales_df, factory_df, aged_index=aged_stock_index("Both"), aged_days=AGED_STOCK_DAYS, metrics=inventory_metrics())
 
     # Display the report when the "Generate Report" button is clicked
     if st.button("Generate Report"):
-        pdf_output = generate_pdf_report()
+        pdf_output = build_report()
         st.success("Report generated successfully!")
         st.download_button(
             label="Download Report as PDF",
             data=pdf_output,
-            file_name="inventory_report.pdf",
+            file_name=REPORT_FILENAME,
             mime="application/pdf"
         )
 
-    # Email functionality (optional)
-    def send_report(receiver_email):
-        sender_email = "ruchitsanap00@gmail.com"
-        subject = "Stock Report"
-        body = "Please find the attached stock report."
-        msg = MIMEMultipart()
-        msg['From'] = sender_email
-        msg['To'] = receiver_email
-        msg['Subject'] = subject
-        msg.attach(MIMEText(body, 'plain'))
-
-        # Attach the PDF report
-        pdf_output = generate_pdf_report()
-        attachment = MIMEText(pdf_output.getvalue(), 'base64', 'application/pdf')
-        attachment.add_header('Content-Disposition', 'attachment', filename="inventory_report.pdf")
-        msg.attach(attachment)
-
-        with smtplib.SMTP('smtp.gmail.com', 587) as server:
-            server.starttls()
-            server.login("ruchitsanap00@gmail.com", "blhm mtru wcbn wqza")
-            server.sendmail(sender_email, receiver_email, msg.as_string())
-        
-        st.success("Report Sent Successfully")
-
-    # Email input and send button
+    # Emails are rendered and sent by the report worker process, not by the web server
     receiver_email = st.text_input("Enter Email Address to Send Report")
     if st.button("Send Report via Email"):
         if receiver_email:
-            send_report(receiver_email)
+            report_worker.enqueue_send(report_worker.JOBS_DB, receiver_email)
+            st.success("Report queued. The report worker will send it shortly.")
         else:
             st.error("Please enter a valid email address.")
 
-    # Schedule reports (optional)
-    def schedule_report():
-        send_report("recipient@example.com")
-
-    schedule.every().monday.at("08:00").do(schedule_report)
-    st.write("Reports are automatically sent every Monday at 08:00 AM.")
-
-# Run Scheduled Jobs in Background
-def run_schedule():
-    while True:
-        schedule.run_pending()
-        time.sleep(60)
-thread = threading.Thread(target=run_schedule, daemon=True)
-thread.start()
+    # Scheduled reports live in the worker's job table (run `python report_worker.py run`)
+    st.write("Scheduled Reports:")
+    st.dataframe(report_worker.list_jobs(report_worker.JOBS_DB)[['name', 'recipient', 'weekday', 'at_time', 'next_run', 'last_status']])
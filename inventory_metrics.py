@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""Dashboard KPIs materialized once per inventory data snapshot.
+
+``InventoryMetrics`` takes the named inventory frames (e.g. sales and
+factory), computes their WT/PCS totals and reduces each frame to a small
+(DATE, category) table of sums with a single groupby.  Every KPI the
+dashboards and the PDF report show is then read from those totals or rolled
+up from the small tables, and each rollup is memoized, so reruns and other
+pages reuse the results instead of rescanning the rows.
+
+Build one instance per snapshot (``Snapshot.derive`` or ``st.cache_resource``).
+Frames without a PCS or WT column count as zero for that measure, matching the
+dashboards' previous behaviour.
+"""
+
+import threading
+
+import pandas as pd
+
+MEASURES = ("WT", "PCS")
+
+
+class InventoryMetrics:
+    """Totals, per-category sums and daily trends for a set of inventory frames."""
+
+    def __init__(self, frames, category_column='CATEGORY', date_column='DATE'):
+        self.names = list(frames)
+        self.category_column = category_column
+        self.date_column = date_column
+        self.totals = {}
+        self.tables = {}
+        self._memo = {}
+        self._lock = threading.Lock()
+        for name, df in frames.items():
+            self.totals[name] = {measure: df[measure].sum() if measure in df.columns else 0 for measure in MEASURES}
+            self.tables[name] = self._summarize(df)
+
+    def _summarize(self, df):
+        measures = [measure for measure in MEASURES if measure in df.columns]
+        keys = [column for column in (self.date_column, self.category_column) if column in df.columns]
+        if not measures or not keys or df.empty:
+            return pd.DataFrame(columns=keys + list(MEASURES))
+        # One pass over the rows; missing dates and categories stay as their own groups
+        table = df.groupby(keys, dropna=False, observed=True, sort=False)[measures].sum().reset_index()
+        for measure in MEASURES:
+            if measure not in table.columns:
+                table[measure] = 0
+        return table
+
+    def _cached(self, key, build):
+        with self._lock:
+            if key not in self._memo:
+                self._memo[key] = build()
+            return self._memo[key]
+
+    def _names(self, names):
+        return self.names if names is None else [names] if isinstance(names, str) else list(names)
+
+    def total(self, measure, names=None):
+        # Sum of a measure over the given frames (all frames by default)
+        return sum(self.totals[name][measure] for name in self._names(names))
+
+    def _combined(self, names, column):
+        tables = [self.tables[name] for name in self._names(names) if column in self.tables[name].columns]
+        return pd.concat(tables, ignore_index=True) if tables else None
+
+    def by_category(self, measure, names=None):
+        # Series of the measure per category, in category order
+        names = tuple(self._names(names))
+
+        def build():
+            table = self._combined(names, self.category_column)
+            if table is None:
+                return pd.Series(dtype=float, name=measure)
+            return table.groupby(self.category_column, observed=True)[measure].sum()
+
+        return self._cached(("category", measure, names), build)
+
+    def over_time(self, measure, names=None, by_day=False):
+        # Series of the measure per DATE (sorted, missing dates dropped); by_day groups on calendar dates
+        names = tuple(self._names(names))
+
+        def build():
+            table = self._combined(names, self.date_column)
+            if table is None:
+                return pd.Series(dtype=float, name=measure)
+            dates = table[self.date_column].dt.date if by_day else table[self.date_column]
+            return table.groupby(dates)[measure].sum()
+
+        return self._cached(("time", measure, names, by_day), build)
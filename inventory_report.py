@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""Inventory sheet sources and the PDF stock report.
+
+Shared by the Streamlit app (manual "Generate Report" downloads) and by
+``report_worker.py``, which renders and delivers the scheduled reports in its
+own process so the web server never runs scheduler threads.
+
+The PDF is streamed page by page through ``pdf_table.TableReport``, and
+``cached_report`` keeps rendered reports on disk keyed by the sheet snapshot
+version, so the app and the worker render each snapshot at most once a day.
+"""
+
+import datetime
+import os
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from io import BytesIO
+
+import pandas as pd
+
+from aged_stock import AgedStockIndex
+from categorize import categorize_design_numbers
+from file_cache import cached_file
+from inventory_metrics import InventoryMetrics
+from pdf_table import TableReport
+
+# Google Sheet URLs (overridable, e.g. to point at a local CSV server for testing)
+SALES_SHEET_URL = os.environ.get("SALES_SHEET_URL", "https://docs.google.com/spreadsheets/d/1Jwx4TntDxlwghFn_eC_NgooXlpvR6WTDdvWy4PO0zgk/export?format=csv&gid=2076018430")
+FACTORY_SHEET_URL = os.environ.get("FACTORY_SHEET_URL", "https://docs.google.com/spreadsheets/d/1Jwx4TntDxlwghFn_eC_NgooXlpvR6WTDdvWy4PO0zgk/export?format=csv&gid=0")
+SHEET_SOURCES = {"sales": SALES_SHEET_URL, "factory": FACTORY_SHEET_URL}
+
+# Items older than this many days count as aged stock
+AGED_STOCK_DAYS = 10
+
+REPORT_FILENAME = "inventory_report.pdf"
+REPORT_CACHE_DIR = os.environ.get("REPORT_CACHE_DIR", ".report_cache")
+REPORT_FORMAT_VERSION = 1  # bump when the layout changes so cached reports are re-rendered
+MAX_CACHED_REPORTS = 20
+REPORT_SUBJECT = "Stock Report"
+REPORT_BODY = "Please find the attached stock report."
+
+
+# Function to prepare a freshly downloaded sheet (runs once per sheet change, off the page render)
+def prepare_sheet(name, df):
+    df['DATE'] = pd.to_datetime(df['DATE'], errors='coerce')
+    df = df[~df['DELIVERED'].astype(str).str.lower().eq('out')].copy()
+    df['CATEGORY'] = categorize_design_numbers(df['DESIGN NO'])  # Vectorized, same first-match rules
+    return df
+
+
+# Function to write the report PDF to a binary file object, one page at a time
+def write_pdf_report(fileobj, sales_df, factory_df, aged_index=None, aged_days=AGED_STOCK_DAYS, metrics=None):
+    if aged_index is None:
+        aged_index = AgedStockIndex(pd.concat([sales_df, factory_df], ignore_index=True))
+    if metrics is None:
+        metrics = InventoryMetrics({"sales": sales_df, "factory": factory_df})
+    report = TableReport(fileobj)
+
+    # Dashboard summary, from the same KPIs the Dashboard page shows
+    report.title("Dashboard Summary")
+    report.text(f"- Total Sales Weight (WT): {metrics.total('WT', 'sales')}")
+    report.text(f"- Total Factory Stock Weight (WT): {metrics.total('WT', 'factory')}")
+    report.text(f"- Overall Inventory Weight (WT): {metrics.total('WT')}")
+
+    # Aged stock summary and breakdown by category
+    report.title("Aged Stock Summary")
+    aged_stock = aged_index.aged(aged_days)
+    report.text(f"- Total Aged Stock Items: {len(aged_stock)}")
+    report.text("Aged Stock by Category:")
+    for category, count in aged_index.category_counts(aged_days).itertuples(index=False):
+        report.text(f"- {category}: {count}")
+
+    # The full aged stock listing, formatted column-wise
+    report.title("Full Aged Stock Data")
+    report.table({
+        "Design No": aged_stock['DESIGN NO'],
+        "Category": aged_stock['CATEGORY'],
+        "Weight": aged_stock['WT'],
+        "Age (days)": aged_stock['AGE'],
+    }, widths=[180, 100, 100, 80])
+    return report.close()
+
+
+# Function to generate the report as a PDF in memory
+def generate_pdf_report(sales_df, factory_df, aged_index=None, aged_days=AGED_STOCK_DAYS, metrics=None):
+    pdf_output = BytesIO()
+    write_pdf_report(pdf_output, sales_df, factory_df, aged_index, aged_days, metrics)
+    pdf_output.seek(0)
+    return pdf_output
+
+
+# Function to get the report for a sheet snapshot, rendering it only on a cache miss
+def cached_report(version, sales_df, factory_df, aged_index=None, aged_days=AGED_STOCK_DAYS, metrics=None,
+                  cache_dir=REPORT_CACHE_DIR):
+    # Ages are counted from today, so the key includes the date as well as the snapshot version
+    name = f"{version}-{aged_days}d-{datetime.date.today():%Y%m%d}-v{REPORT_FORMAT_VERSION}.pdf"
+    path = cached_file(
+        cache_dir, name,
+        lambda f: write_pdf_report(f, sales_df, factory_df, aged_index, aged_days, metrics),
+        max_files=MAX_CACHED_REPORTS,
+    )
+    with open(path, "rb") as f:
+        return f.read()
+
+
+# Function to wrap a rendered report in an email with the PDF attached
+def build_report_message(pdf_bytes, sender, receiver, subject=REPORT_SUBJECT, body=REPORT_BODY):
+    msg = MIMEMultipart()
+    msg['From'] = sender
+    msg['To'] = receiver
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'plain'))
+
+    attachment = MIMEApplication(pdf_bytes, _subtype='pdf')
+    attachment.add_header('Content-Disposition', 'attachment', filename=REPORT_FILENAME)
+    msg.attach(attachment)
+    return msg
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""Declared column schemas for the Monthly Sale and Export Sale ledgers.
+
+A ``LedgerSchema`` lists the columns a ledger format uses and what kind of
+data each holds.  Loading through a schema:
+
+- checks the header for the required columns before parsing any rows;
+- reads only the declared columns (``usecols``);
+- stores text keys (party, category, type, ...) as categoricals, with
+  numeric codes (SIZE, CatCd, ...) kept as numeric categories, so they sort
+  and compare like the default-dtype load, in CSV and Excel uploads alike;
+- downcasts numbers only where no value changes (integers to the smallest
+  integer type, floats to float32 only if every value is exactly
+  representable), so sums and totals stay the same;
+- parses each distinct date string once instead of once per row.
+
+The loaded frame carries a ``memory_report`` in ``attrs`` comparing its size
+with the default-dtype frame.  Group on the categorical keys with
+``observed=True``, and pass grouped results through ``plain_keys`` before
+plotting them, since seaborn draws every category of a categorical axis,
+observed or not.
+"""
+
+import pandas as pd
+
+# Bump when the declared dtypes change, so sidecars written with older schemas are not reused
+SCHEMA_VERSION = 2
+
+
+class LedgerSchema:
+    """Column kinds ('date', 'category', 'integer', 'float') and required columns of a ledger format."""
+
+    def __init__(self, name, columns, required=None, date_format=None):
+        self.name = name
+        self.columns = dict(columns)
+        self.required = list(required if required is not None else columns)
+        self.date_format = date_format
+
+    @property
+    def key(self):
+        # Identifies the schema in cache and sidecar keys
+        return f"{self.name}-v{SCHEMA_VERSION}"
+
+    def validate(self, columns):
+        missing = [column for column in self.required if column not in columns]
+        if missing:
+            raise ValueError(f"The dataset must contain these columns: {self.required} (missing: {missing})")
+
+    def read(self, fileobj, is_csv):
+        # Header first: fail on missing columns before reading any rows
+        fileobj.seek(0)
+        reader = pd.read_csv if is_csv else pd.read_excel
+        header = list(reader(fileobj, nrows=0).columns)
+        self.validate(header)
+        present = [column for column in header if column in self.columns]
+
+        # Text keys go straight to categoricals; in CSVs date strings do too, and are parsed per category
+        parse_as_category = ('category', 'date') if is_csv else ('category',)
+        dtype = {column: 'category' for column in present if self.columns[column] in parse_as_category}
+        fileobj.seek(0)
+        df = self.optimize(reader(fileobj, usecols=present, dtype=dtype))
+        # dtype='category' reads every value as text (CSV) or object (Excel); numbers go back to numbers
+        for column in present:
+            if self.columns[column] == 'category':
+                df[column] = numeric_categories(df[column])
+        return df
+
+    def optimize(self, df):
+        # Convert each declared column to its compact dtype
+        for column in df.columns:
+            kind = self.columns.get(column)
+            if kind == 'date':
+                df[column] = parse_dates(df[column], self.date_format)
+            elif kind == 'category' and not isinstance(df[column].dtype, pd.CategoricalDtype):
+                df[column] = df[column].astype('category')
+            elif kind in ('integer', 'float'):
+                df[column] = downcast(df[column])
+        return df
+
+
+# Function to parse a date column, converting each distinct value once for categoricals
+def parse_dates(series, date_format=None):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = pd.to_datetime(series.cat.categories, format=date_format)
+        # Code -1 (missing) becomes NaT
+        values = categories.take(series.cat.codes.to_numpy(), allow_fill=True, fill_value=pd.NaT)
+        return pd.Series(values, index=series.index, name=series.name)
+    return pd.to_datetime(series, format=date_format)
+
+
+# Function to turn categories that read_csv would have parsed as numbers back into numbers
+def numeric_categories(series):
+    categories = series.cat.categories
+    if pd.api.types.is_numeric_dtype(categories) or not is_numeric_text(categories):
+        return series
+    numbers = pd.Index(pd.to_numeric(categories))
+    if numbers.has_duplicates:
+        # Spellings of one number (e.g. '8' and '08') become a single category
+        return pd.to_numeric(series.astype(object)).astype('category')
+    # Keep the categories in numeric order (8, 10, 12), not text order (10, 12, 8)
+    return series.cat.rename_categories(numbers).cat.reorder_categories(numbers.sort_values())
+
+
+# Function to downcast a numeric column only when every value survives the conversion
+def downcast(series):
+    if pd.api.types.is_integer_dtype(series):
+        return pd.to_numeric(series, downcast='integer')
+    if pd.api.types.is_float_dtype(series) and series.dtype.itemsize > 4:
+        narrow = series.astype('float32')
+        if narrow.astype(series.dtype).equals(series):
+            return narrow
+    return series
+
+
+# Function to convert categorical columns back to plain values (for plotting grouped results)
+def plain_keys(df):
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype(df[column].cat.categories.dtype).infer_objects()
+    return df
+
+
+# Function to check whether category values would have been read as numbers
+def is_numeric_text(categories):
+    try:
+        pd.to_numeric(categories)
+    except (ValueError, TypeError):
+        return False
+    return True
+
+
+# Function to size each column as loaded and as it would be with default dtypes
+def memory_report(df):
+    columns = {}
+    for column in df.columns:
+        series = df[column]
+        optimized = int(series.memory_usage(index=False, deep=True))
+        if isinstance(series.dtype, pd.CategoricalDtype) and not is_numeric_text(series.cat.categories):
+            # Default read: plain text column (sized one column at a time)
+            default = int(series.astype(series.cat.categories.dtype).memory_usage(index=False, deep=True))
+        elif isinstance(series.dtype, pd.CategoricalDtype):
+            # Numeric codes (e.g. SIZE, CatCd) would have been read as 64-bit numbers
+            default = len(series) * 8
+        elif pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            default = len(series) * 8
+        else:
+            default = optimized
+        columns[column] = (default, optimized)
+    default_bytes = sum(default for default, _ in columns.values())
+    optimized_bytes = sum(optimized for _, optimized in columns.values())
+    return dict(columns=columns, default_bytes=default_bytes, optimized_bytes=optimized_bytes,
+                saved_bytes=default_bytes - optimized_bytes)
+
+
+# Function to describe a memory report in one line
+def memory_report_text(report):
+    saved = report['saved_bytes']
+    share = saved / report['default_bytes'] if report['default_bytes'] else 0
+    return (f"Loaded with the declared schema: {report['optimized_bytes'] / 2**20:.1f} MiB in memory, "
+            f"{saved / 2**20:.1f} MiB ({share:.0%}) less than with default dtypes.")
+
+
+MONTHLY_SALE = LedgerSchema('monthly_sale', {
+    'DocDate': 'date',
+    'type': 'category',
+    'parName': 'category',
+    'CATEGORY': 'category',
+    'CatCd': 'category',
+    'weight': 'float',
+    'noPcs': 'integer',
+})
+
+EXPORT_SALE = LedgerSchema('export_sale', {
+    'DATE': 'date',
+    'PARTY': 'category',
+    'TYPE': 'category',
+    'SIZE': 'category',
+    'DESIGN NO': 'category',
+    'WEIGHT': 'float',
+    'QTY': 'integer',
+}, required=['DATE', 'PARTY', 'TYPE', 'SIZE', 'WEIGHT', 'QTY'])
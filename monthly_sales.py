@@ -8,16 +8,16 @@ Original file is located at
 """
 
 import streamlit as st
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
+from data_loader import load_uploaded_file, preview_uploaded_file
+from sales_summary import REQUIRED_COLUMNS, STREAM_THRESHOLD_BYTES, load_sales_summary
+from ledger_schema import MONTHLY_SALE, memory_report_text
 
 def load_data(uploaded_file):
     try:
-        if uploaded_file.name.endswith('.csv'):
-            return pd.read_csv(uploaded_file)
-        else:
-            return pd.read_excel(uploaded_file)
+        # Only the first rows, every column included; the summary reads the rest
+        return preview_uploaded_file(uploaded_file)
     except Exception as e:
         st.error(f"Error loading file: {e}")
         return None
@@ -28,25 +28,30 @@ def main():
     uploaded_file = st.file_uploader("Upload a CSV or Excel file", type=["csv", "xlsx"])
 
     if uploaded_file is not None:
+        out_of_core = False
+        if uploaded_file.name.endswith('.csv'):
+            out_of_core = st.checkbox("Out-of-core mode (stream the CSV in chunks)",
+                                      value=uploaded_file.size > STREAM_THRESHOLD_BYTES)
         data = load_data(uploaded_file)
         if data is not None:
             st.subheader("First 10 rows of data")
             st.dataframe(data.head(10))
 
-            required_columns = ['DocDate', 'type', 'parName', 'CATEGORY', 'CatCd', 'weight', 'noPcs']
-            if not all(col in data.columns for col in required_columns):
+            if not all(col in data.columns for col in REQUIRED_COLUMNS):
                 st.error("Missing required columns.")
             else:
-                data = data[~data['CATEGORY'].isin(['ST', 'LOOSE PCS', 'PARA BIDS', 'Langadi', 'PROCESS LOSS',
-                                                    'SCRAP PCC', 'BALL CHAIN', 'SIGNING TAR', 'Fine'])]
+                if not out_of_core:
+                    # The declared schema loads the columns with compact dtypes (cached for the summary)
+                    st.caption(memory_report_text(load_uploaded_file(uploaded_file, schema=MONTHLY_SALE).attrs['memory_report']))
 
-                party_weight_summary = data.groupby('parName')['weight'].sum().reset_index()
-                party_weight_summary = party_weight_summary.sort_values(by='weight', ascending=False)
+                # Excluded categories are dropped and weights summed per party and category (cached per file)
+                summary = load_sales_summary(uploaded_file, out_of_core=out_of_core)
+                party_weight_summary = summary.ranking('parName')[['parName', 'weight']]
 
                 st.subheader("Summary Statistics")
                 st.write(f"Total Parties: {len(party_weight_summary)}")
-                st.write(f"Total Categories: {len(data['CatCd'].unique())}")
-                st.write(f"Total Weight: {round(data['weight'].sum(), 2)}")
+                st.write(f"Total Categories: {len(summary.category_weight)}")
+                st.write(f"Total Weight: {round(summary.total_weight, 2)}")
 
                 st.subheader("Top 10 Parties by Weight")
                 st.dataframe(party_weight_summary.head(10))
@@ -1,10 +1,10 @@
 
 import streamlit as st
-import pandas as pd
 from PIL import Image, ImageDraw, ImageFont
 from datetime import datetime
 import os
 from io import BytesIO
+import order_store
  
 # Function for user authentication
 def login(users):
@@ -55,38 +55,33 @@ def combine_image_with_text(image, details):
  
     return combined_image
  
-# Function to save data to Excel
-def save_to_excel(details, excel_file_path):
-    if os.path.exists(excel_file_path):
-        df = pd.read_excel(excel_file_path)
-        new_entry = pd.DataFrame([details])
-        df = pd.concat([df, new_entry], ignore_index=True)
-    else:
-        df = pd.DataFrame([details])
-    df.to_excel(excel_file_path, index=False)
+# Function to save an order (single atomic append to the order database)
+def save_order(details, db_path):
+    order_store.append_order(db_path, details)
  
 # Function to generate summary report
-def generate_summary_report(excel_file_path):
-    if os.path.exists(excel_file_path):
-        df = pd.read_excel(excel_file_path)
-        return df
-    else:
-        return pd.DataFrame()
+def generate_summary_report(db_path):
+    return order_store.load_orders(db_path)
  
 # Function to delete orders based on date or all data
-def delete_orders(excel_file_path, date_to_delete=None):
-    if os.path.exists(excel_file_path):
-        df = pd.read_excel(excel_file_path)
+def delete_orders(db_path, date_to_delete=None):
+    if os.path.exists(db_path):
+        order_store.delete_orders(db_path, date_to_delete)
         if date_to_delete:
-            df = df[df["Date"] != str(date_to_delete)]  # Keep rows not matching the date
             st.success(f"Orders for {date_to_delete} have been deleted.")
         else:
-            df = pd.DataFrame()  # Clear all data
             st.success("All orders have been deleted.")
-        df.to_excel(excel_file_path, index=False)
     else:
         st.info("No data exists yet.")
  
+# Maximum number of rows shown for a party name search
+SEARCH_RESULT_LIMIT = 500
+ 
+# Function to set up a user's order database once per process instead of on every rerun
+@st.cache_resource
+def init_order_store(db_path, excel_file_path):
+    return order_store.initialize(db_path, excel_file_path)
+
 # Streamlit app
 users = {"user1": "password1", "user2": "password2"}
 username = login(users)
@@ -96,6 +91,8 @@ if username:
     menu = st.sidebar.radio("Select an option", ["Add New Order", "View Summary Report", "Search Order", "Delete Orders", "Download Data"])
  
     excel_file_path = f"{username}_order_details.xlsx"
+    db_path = order_store.order_db_path(username)
+    init_order_store(db_path, excel_file_path)  # Schema and one-time migration of the old workbook
  
     if menu == "Add New Order":
         st.title("Add New Order")
@@ -139,7 +136,7 @@ if username:
                 output_image_path = f"combined_order_image_{Order_no}_{timestamp}.png"
                 combined_image.save(output_image_path)
  
-                save_to_excel(details, excel_file_path)
+                save_order(details, db_path)
  
                 st.image(combined_image, caption="Combined Image")
                 st.success(f"Order saved successfully! Combined image saved as {output_image_path}")
@@ -154,12 +151,12 @@ if username:
                     mime="image/png"
                 )
             else:
-                save_to_excel(details, excel_file_path)
+                save_order(details, db_path)
                 st.success("Order details have been saved without an image.")
  
     elif menu == "View Summary Report":
         st.title("Summary Report")
-        df = generate_summary_report(excel_file_path)
+        df = generate_summary_report(db_path)
         if not df.empty:
             st.dataframe(df)
         else:
@@ -168,41 +165,42 @@ if username:
     elif menu == "Search Order":
         st.title("Search Order")
         search_by = st.radio("Search By", ["Order No", "Party Name"])
+        # Results refresh as the input changes, served from the order database indexes
         search_input = st.text_input(f"Enter {search_by}")
-        if st.button("Search"):
-            df = generate_summary_report(excel_file_path)
-            if not df.empty:
-                if search_by == "Order No":
-                    result = df[df["Order No"] == search_input]
-                else:
-                    result = df[df["Party Name"].str.contains(search_input, case=False, na=False)]
-                if not result.empty:
-                    st.write(result)
-                else:
-                    st.error("Order not found.")
+        if search_input:
+            if search_by == "Order No":
+                result = order_store.find_by_order_no(db_path, search_input.strip())
             else:
+                result = order_store.search_party_name(db_path, search_input, limit=SEARCH_RESULT_LIMIT)
+            if not result.empty:
+                if len(result) == SEARCH_RESULT_LIMIT:
+                    st.caption(f"Showing the first {SEARCH_RESULT_LIMIT} matches.")
+                st.write(result)
+            elif not os.path.exists(db_path):
                 st.info("No orders have been entered yet.")
+            else:
+                st.error("Order not found.")
  
     elif menu == "Delete Orders":
         st.title("Delete Orders")
         delete_option = st.radio("Delete Option", ["Delete All Orders", "Delete by Date"])
         if delete_option == "Delete All Orders":
             if st.button("Delete All"):
-                delete_orders(excel_file_path)
+                delete_orders(db_path)
         elif delete_option == "Delete by Date":
             date_to_delete = st.date_input("Select Date to Delete")
             if st.button("Delete by Date"):
-                delete_orders(excel_file_path, date_to_delete)
+                delete_orders(db_path, date_to_delete)
  
     elif menu == "Download Data":
         st.title("Download Data")
-        if os.path.exists(excel_file_path):
-            with open(excel_file_path, "rb") as file:
-                st.download_button(
-                    label="Download Excel File",
-                    data=file,
-                    file_name=excel_file_path,
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
+        if os.path.exists(db_path):
+            # Excel is generated only when the download page is opened
+            st.download_button(
+                label="Download Excel File",
+                data=order_store.export_excel(db_path),
+                file_name=excel_file_path,
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
         else:
             st.info("No data file exists yet.")
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""SQLite order store used by the order entry apps.
+
+Each user's orders live in a SQLite database in WAL mode.  Submitting an order
+is a single INSERT inside a transaction, so it is O(1) and atomic, and several
+browser tabs can submit at the same time without losing rows.  Excel is only
+produced on demand for downloads.
+
+Searches are served from indexes kept up to date by SQLite itself: a B-tree
+index on the order number and an FTS5 trigram index on the party name that
+triggers maintain on every insert and delete.
+
+``initialize`` creates the schema, the party index and runs the one-time
+legacy Excel import; the apps call it once per database path (from
+``st.cache_resource``), so ``connect`` only opens a connection and every
+rerun skips the DDL and catalog lookups.
+"""
+
+import os
+import sqlite3
+from contextlib import closing
+from io import BytesIO
+
+import pandas as pd
+
+# Order fields as shown in the app, mapped to their database column names
+ORDER_COLUMNS = {
+    "Date": "date",
+    "Party Code": "party_code",
+    "Order No": "order_no",
+    "Party Name": "party_name",
+    "Weight": "weight",
+    "Size": "size",
+    "PCS": "pcs",
+    "Rhodium": "rhodium",
+    "Remark": "remark",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT,
+    party_code TEXT,
+    order_no TEXT,
+    party_name TEXT,
+    weight TEXT,
+    size TEXT,
+    pcs TEXT,
+    rhodium TEXT,
+    remark TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_orders_date ON orders (date);
+CREATE INDEX IF NOT EXISTS idx_orders_order_no ON orders (order_no);
+CREATE INDEX IF NOT EXISTS idx_orders_party_name ON orders (party_name COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# meta row marking that the legacy Excel workbook has been imported
+LEGACY_IMPORT_KEY = "legacy_excel_imported"
+
+# Trigram index over party names, kept in sync with the orders table by triggers
+PARTY_INDEX_SCHEMA = """
+CREATE VIRTUAL TABLE orders_party_fts USING fts5(
+    party_name, content='orders', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER orders_party_fts_insert AFTER INSERT ON orders BEGIN
+    INSERT INTO orders_party_fts (rowid, party_name) VALUES (new.id, new.party_name);
+END;
+CREATE TRIGGER orders_party_fts_delete AFTER DELETE ON orders BEGIN
+    INSERT INTO orders_party_fts (orders_party_fts, rowid, party_name) VALUES ('delete', old.id, old.party_name);
+END;
+CREATE TRIGGER orders_party_fts_update AFTER UPDATE ON orders BEGIN
+    INSERT INTO orders_party_fts (orders_party_fts, rowid, party_name) VALUES ('delete', old.id, old.party_name);
+    INSERT INTO orders_party_fts (rowid, party_name) VALUES (new.id, new.party_name);
+END;
+"""
+
+# Trigram queries need at least three characters; shorter input falls back to a LIKE substring scan
+MIN_TRIGRAM_QUERY = 3
+
+
+# Function to build the database path for a user
+def order_db_path(username):
+    return f"{username}_orders.db"
+
+
+# Function to open the order database (set up by initialize)
+def connect(db_path):
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+# Function to create the schema and indexes and import the legacy workbook; run once per database
+def initialize(db_path, excel_file_path=None):
+    with closing(connect(db_path)) as conn:
+        conn.executescript(SCHEMA)
+        ensure_party_index(conn)
+    return import_excel(db_path, excel_file_path) if excel_file_path else 0
+
+
+# Function to create the party name trigram index (and backfill it) if it is missing
+def ensure_party_index(conn):
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'orders_party_fts'"
+    ).fetchone()
+    if exists:
+        return True
+    try:
+        conn.executescript(PARTY_INDEX_SCHEMA)
+        conn.execute("INSERT INTO orders_party_fts (orders_party_fts) VALUES ('rebuild')")
+        conn.commit()
+    except sqlite3.OperationalError:
+        # SQLite builds without FTS5 trigram support use the plain LIKE fallback
+        return False
+    return True
+
+
+# Function to append a single order
+def append_order(db_path, details):
+    columns = list(ORDER_COLUMNS.values())
+    values = [None if details.get(field) is None else str(details.get(field)) for field in ORDER_COLUMNS]
+    placeholders = ", ".join("?" for _ in columns)
+    with closing(connect(db_path)) as conn, conn:
+        conn.execute(f"INSERT INTO orders ({', '.join(columns)}) VALUES ({placeholders})", values)
+
+
+# Function to load all orders in submission order
+def load_orders(db_path):
+    return query_orders(db_path, "1 = 1")
+
+
+# Function to select orders matching a WHERE clause
+def query_orders(db_path, where, params=(), limit=None):
+    if not os.path.exists(db_path):
+        return pd.DataFrame()
+    select = ", ".join(f'{column} AS "{field}"' for field, column in ORDER_COLUMNS.items())
+    sql = f"SELECT {select} FROM orders WHERE {where} ORDER BY id"
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    with closing(connect(db_path)) as conn:
+        return pd.read_sql_query(sql, conn, params=list(params))
+
+
+# Function to look up orders by exact order number
+def find_by_order_no(db_path, order_no, limit=None):
+    return query_orders(db_path, "order_no = ?", (str(order_no),), limit)
+
+
+# Function to escape LIKE wildcards in user input
+def _like_escape(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# Function to search orders whose party name contains the text (case-insensitive)
+def search_party_name(db_path, text, limit=None):
+    text = text.strip()
+    if not text:
+        return query_orders(db_path, "1 = 1", limit=limit)
+    if len(text) < MIN_TRIGRAM_QUERY:
+        # Too short for the trigram index: substring scan, same matches as longer queries
+        return query_orders(db_path, "party_name LIKE '%' || ? || '%' ESCAPE '\\'", (_like_escape(text),), limit)
+    phrase = '"' + text.replace('"', '""') + '"'
+    try:
+        return query_orders(
+            db_path,
+            "id IN (SELECT rowid FROM orders_party_fts WHERE orders_party_fts MATCH ?)",
+            (phrase,),
+            limit,
+        )
+    except (sqlite3.OperationalError, pd.errors.DatabaseError):
+        return query_orders(db_path, "party_name LIKE ? ESCAPE '\\'", ("%" + _like_escape(text) + "%",), limit)
+
+
+# Function to delete the orders for one date, or every order; returns the number removed
+def delete_orders(db_path, date_to_delete=None):
+    with closing(connect(db_path)) as conn, conn:
+        if date_to_delete:
+            cursor = conn.execute("DELETE FROM orders WHERE date = ?", (str(date_to_delete),))
+        else:
+            cursor = conn.execute("DELETE FROM orders")
+        return cursor.rowcount
+
+
+# Function to import orders from the legacy Excel file exactly once per (initialized) database
+def import_excel(db_path, excel_file_path):
+    if not os.path.exists(excel_file_path):
+        return 0
+    with closing(connect(db_path)) as conn:
+        if _legacy_imported(conn):
+            return 0
+        legacy = pd.read_excel(excel_file_path, dtype=str)
+        rows = [
+            [None if pd.isna(row.get(field)) else row.get(field) for field in ORDER_COLUMNS]
+            for row in legacy.to_dict("records")
+        ]
+        columns = ", ".join(ORDER_COLUMNS.values())
+        placeholders = ", ".join("?" for _ in ORDER_COLUMNS)
+        # The rows and the flag commit together under the write lock, so a concurrent
+        # session waits, sees the flag and skips, and a failed import leaves no trace
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if _legacy_imported(conn):
+                conn.rollback()
+                return 0
+            # Databases from before the flag existed already hold the imported (or newer) orders
+            if conn.execute("SELECT 1 FROM orders LIMIT 1").fetchone() is not None:
+                rows = []
+            conn.executemany(f"INSERT INTO orders ({columns}) VALUES ({placeholders})", rows)
+            conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (LEGACY_IMPORT_KEY, str(len(rows))))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    return len(rows)
+
+
+# Function to check the legacy import flag
+def _legacy_imported(conn):
+    return conn.execute("SELECT 1 FROM meta WHERE key = ?", (LEGACY_IMPORT_KEY,)).fetchone() is not None
+
+
+# Function to export the orders to an Excel workbook in memory
+def export_excel(db_path):
+    output = BytesIO()
+    load_orders(db_path).to_excel(output, index=False)
+    return output.getvalue()
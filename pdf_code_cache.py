@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""Persistent cache of extracted PDF codes keyed by PDF content hash.
+
+Entries are keyed on the hash of the PDF bytes together with an extractor
+version (the code pattern and PyPDF2 version), so changing either invalidates
+old results.  The cache is a small SQLite database trimmed to a maximum number
+of entries, dropping the least recently used first.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+import PyPDF2
+
+from pdf_codes import CODE_PATTERN, extract_codes_parallel
+
+CACHE_DB_PATH = os.environ.get("PDF_CODE_CACHE_DB", "pdf_code_cache.db")
+MAX_ENTRIES = 5000
+
+# Bumping any part of this string invalidates every cached result
+EXTRACTOR_VERSION = f"{CODE_PATTERN.pattern}|PyPDF2-{PyPDF2.__version__}|1"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pdf_codes (
+    key TEXT PRIMARY KEY,
+    codes TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pdf_codes_last_used ON pdf_codes (last_used);
+"""
+
+
+# Function to build the cache key for a PDF's contents
+def pdf_key(pdf_bytes):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(EXTRACTOR_VERSION.encode("utf-8"))
+    digest.update(pdf_bytes)
+    return digest.hexdigest()
+
+
+# Function to open the cache database
+def connect(db_path=CACHE_DB_PATH):
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+# Function to look up cached codes for a batch of keys
+def get_many(keys, db_path=CACHE_DB_PATH):
+    if not keys:
+        return {}
+    found = {}
+    with closing(connect(db_path)) as conn, conn:
+        for key in set(keys):
+            row = conn.execute("SELECT codes FROM pdf_codes WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                found[key] = json.loads(row[0])
+        conn.executemany(
+            "UPDATE pdf_codes SET last_used = ? WHERE key = ?",
+            [(time.time(), key) for key in found],
+        )
+    return found
+
+
+# Function to store extracted codes and trim the cache to its size limit
+def put(key, codes, db_path=CACHE_DB_PATH, max_entries=MAX_ENTRIES):
+    with closing(connect(db_path)) as conn, conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO pdf_codes (key, codes, last_used) VALUES (?, ?, ?)",
+            (key, json.dumps(codes), time.time()),
+        )
+        conn.execute(
+            "DELETE FROM pdf_codes WHERE key IN ("
+            " SELECT key FROM pdf_codes ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (max_entries,),
+        )
+
+
+# Function to remove every cached result
+def clear(db_path=CACHE_DB_PATH):
+    with closing(connect(db_path)) as conn, conn:
+        conn.execute("DELETE FROM pdf_codes")
+
+
+# Function to extract codes with the cache in front, yielding (index, name, codes, cache_hit)
+def extract_codes_cached(files, db_path=CACHE_DB_PATH, **kwargs):
+    keys = [pdf_key(pdf_bytes) for _, pdf_bytes in files]
+    cached = get_many(keys, db_path)
+
+    misses = []
+    for index, (name, pdf_bytes) in enumerate(files):
+        if keys[index] in cached:
+            yield index, name, cached[keys[index]], True
+        else:
+            misses.append(index)
+
+    # Only the cache misses go through the process pool
+    pending = [files[index] for index in misses]
+    for position, name, codes in extract_codes_parallel(pending, **kwargs):
+        index = misses[position]
+        put(keys[index], codes, db_path)
+        yield index, name, codes, False
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""Image code extraction from party PDFs.
+
+Text extraction with PyPDF2 is CPU bound, so uploads are split into page
+ranges and spread over a process pool.  Each upload is written to a temporary
+file once and workers open it by path, so a task ships only a path and a page
+range, never the PDF itself.  Ranges are sized to give each worker about one
+range per file, so a large PDF is parsed by each worker once rather than once
+per few pages.  Results are yielded per file as soon as every page range of
+that file has finished.
+
+Codes are scanned page by page with ``CodeScanner``, which only carries a
+short tail of unmatched text between pages.  Memory therefore stays flat no
+matter how many pages a PDF has, while codes split across a page boundary are
+still found exactly as if the whole text had been concatenated.
+"""
+
+import math
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from io import BytesIO
+from multiprocessing import get_context
+
+from PyPDF2 import PdfReader
+
+# Image codes look like "ITABC123.JPG"; compiled once and shared by every worker
+CODE_PATTERN = re.compile(r"(IT[A-Z]+\d+)\.(?:JPG|jpg)")
+
+# Fewest pages handled by one worker task; large files get one range per worker instead
+PAGES_PER_TASK = 25
+
+# Longest unmatched text carried over to the next page; far longer than any code
+MAX_CARRY = 256
+
+
+class CodeScanner:
+    """Incremental code matcher fed one page of text at a time."""
+
+    def __init__(self, max_carry=MAX_CARRY):
+        self.max_carry = max_carry
+        self.carry = ""
+        self.carry_page = None
+
+    def feed(self, text, page_no):
+        # Returns (code, page_no) pairs; a code is attributed to the page it starts on
+        buffer = self.carry + text
+        found = []
+        last_end = 0
+        for match in CODE_PATTERN.finditer(buffer):
+            start_page = page_no if match.start() >= len(self.carry) else self.carry_page
+            found.append((match.group(1)[2:], start_page))
+            last_end = match.end()
+        # Only text after the last match can still start a code completed by the next page
+        tail_start = max(last_end, len(buffer) - self.max_carry)
+        if tail_start >= len(self.carry):
+            self.carry_page = page_no
+        self.carry = buffer[tail_start:]
+        return found
+
+
+# Function to stream (party, code, page_no) tuples from a PDF one page at a time
+def iter_codes_from_pdf(pdf_file, party=None):
+    reader = PdfReader(pdf_file)
+    scanner = CodeScanner()
+    for page_no, page in enumerate(reader.pages, start=1):
+        for code, code_page in scanner.feed(page.extract_text() or "", page_no):
+            yield party, code, code_page
+
+
+# Function to extract image codes from a PDF and clean them
+def extract_codes_from_pdf(pdf_file):
+    return [code for _, code, _ in iter_codes_from_pdf(pdf_file)]
+
+
+# Function to extract the text of each page in a range of a PDF file (runs inside a worker process)
+def extract_page_range(pdf_path, start, stop):
+    reader = PdfReader(pdf_path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+# Function to split a PDF into about one page range per worker (never fewer than pages_per_task pages each)
+def page_ranges(pdf_bytes, workers=1, pages_per_task=PAGES_PER_TASK):
+    page_count = len(PdfReader(BytesIO(pdf_bytes)).pages)
+    size = max(pages_per_task, math.ceil(page_count / workers))
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+# Function to extract codes from (name, pdf_bytes) pairs in parallel, yielding (index, name, codes) per finished file
+def extract_codes_parallel(files, max_workers=None, pages_per_task=PAGES_PER_TASK):
+    workers = max_workers or os.cpu_count() or 1
+    ranges = [page_ranges(pdf_bytes, workers, pages_per_task) for _, pdf_bytes in files]
+    task_count = sum(len(file_ranges) for file_ranges in ranges)
+
+    # A single small file is not worth starting worker processes for
+    if task_count <= 1:
+        for index, (name, pdf_bytes) in enumerate(files):
+            yield index, name, extract_codes_from_pdf(BytesIO(pdf_bytes))
+        return
+
+    # Spawned workers only import this module, not the Streamlit script that called us
+    with tempfile.TemporaryDirectory(prefix="pdf-codes-") as directory, \
+            ProcessPoolExecutor(max_workers=min(task_count, workers), mp_context=get_context("spawn")) as pool:
+        futures = {}
+        for index, (_, pdf_bytes) in enumerate(files):
+            # Written once; each task gets the path and its page range
+            path = os.path.join(directory, f"{index}.pdf")
+            with open(path, "wb") as f:
+                f.write(pdf_bytes)
+            for chunk, (start, stop) in enumerate(ranges[index]):
+                futures[pool.submit(extract_page_range, path, start, stop)] = (index, chunk)
+
+        # Page ranges are scanned in order as they become contiguous, so only
+        # ranges that finished early are held in memory
+        scanners = [CodeScanner() for _ in files]
+        codes = [[] for _ in files]
+        pending = [{} for _ in files]
+        next_chunk = [0] * len(files)
+        for index, file_ranges in enumerate(ranges):
+            if not file_ranges:
+                yield index, files[index][0], []
+
+        for future in as_completed(futures):
+            index, chunk = futures[future]
+            pending[index][chunk] = future.result()
+            while next_chunk[index] in pending[index]:
+                page_texts = pending[index].pop(next_chunk[index])
+                first_page = ranges[index][next_chunk[index]][0] + 1
+                for page_no, text in enumerate(page_texts, start=first_page):
+                    codes[index].extend(code for code, _ in scanners[index].feed(text, page_no))
+                next_chunk[index] += 1
+            if next_chunk[index] == len(ranges[index]):
+                yield index, files[index][0], codes[index]
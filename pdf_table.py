@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""Minimal streaming PDF writer for long tabular reports.
+
+Table rows are formatted from column arrays a batch of pages at a time (one
+vectorized string pass per column per batch), then cut into pages that are
+written to the output file as soon as each is full, so memory stays
+proportional to one batch rather than the whole document.  Only the standard
+Helvetica fonts are used; every PDF reader has them built in, so no font data
+is embedded.
+
+Text is written with WinAnsi (latin-1) encoding; characters outside latin-1
+are replaced with '?'.
+"""
+
+import pandas as pd
+
+PAGE_WIDTH = 595  # A4 in points
+PAGE_HEIGHT = 842
+MARGIN = 36
+FONT_SIZE = 9
+LINE_HEIGHT = 12
+TITLE_SIZE = 13
+BATCH_PAGES = 50
+
+_FONTS = {"F1": "Helvetica", "F2": "Helvetica-Bold"}
+
+
+# Function to escape text for a PDF string literal
+def escape_text(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)").replace("\r", " ").replace("\n", " ")
+
+
+# Function to escape a whole column of values at once
+def _escape_column(values):
+    return (values.astype(str)
+            .str.replace("\\", "\\\\", regex=False)
+            .str.replace("(", "\\(", regex=False)
+            .str.replace(")", "\\)", regex=False)
+            .str.replace("\r", " ", regex=False)
+            .str.replace("\n", " ", regex=False)
+            .astype(object))
+
+
+class PDFStreamWriter:
+    """Writes PDF objects straight to a binary file object and finishes with the xref table."""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.offsets = {}
+        self.page_ids = []
+        self.position = 0
+        # Fixed ids: 1 catalog, 2 page tree, then the fonts; pages are numbered after them
+        self.font_ids = {name: 3 + i for i, name in enumerate(_FONTS)}
+        self.next_id = 3 + len(_FONTS)
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        for name, base_font in _FONTS.items():
+            self._object(self.font_ids[name], (
+                f"<< /Type /Font /Subtype /Type1 /BaseFont /{base_font} /Encoding /WinAnsiEncoding >>"
+            ).encode("ascii"))
+
+    def _write(self, data):
+        self.fileobj.write(data)
+        self.position += len(data)
+
+    def _object(self, object_id, body):
+        self.offsets[object_id] = self.position
+        self._write(f"{object_id} 0 obj\n".encode("ascii") + body + b"\nendobj\n")
+
+    def _allocate(self):
+        object_id = self.next_id
+        self.next_id += 1
+        return object_id
+
+    def add_page(self, content):
+        # content is the page's uncompressed content stream (bytes)
+        content_id, page_id = self._allocate(), self._allocate()
+        self._object(content_id, f"<< /Length {len(content)} >>\nstream\n".encode("ascii") + content + b"\nendstream")
+        fonts = " ".join(f"/{name} {object_id} 0 R" for name, object_id in self.font_ids.items())
+        self._object(page_id, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << {fonts} >> >> /Contents {content_id} 0 R >>"
+        ).encode("ascii"))
+        self.page_ids.append(page_id)
+
+    def close(self):
+        kids = " ".join(f"{page_id} 0 R" for page_id in self.page_ids)
+        self._object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>".encode("ascii"))
+        self._object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        xref_offset = self.position
+        lines = [f"xref\n0 {self.next_id}\n", "0000000000 65535 f \n"]
+        for object_id in range(1, self.next_id):
+            lines.append(f"{self.offsets[object_id]:010d} 00000 n \n")
+        lines.append(f"trailer\n<< /Size {self.next_id} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n")
+        self._write("".join(lines).encode("ascii"))
+        return len(self.page_ids)
+
+
+class TableReport:
+    """Lays out headings, text lines and long tables over as many pages as needed."""
+
+    def __init__(self, fileobj, font_size=FONT_SIZE, line_height=LINE_HEIGHT):
+        self.writer = PDFStreamWriter(fileobj)
+        self.font_size = font_size
+        self.line_height = line_height
+        self.rows_per_page = int((PAGE_HEIGHT - 2 * MARGIN) // line_height)
+        self.lines = []  # one entry per text line of the current page, each ending on the next line
+
+    def _flush(self):
+        if self.lines:
+            top = PAGE_HEIGHT - MARGIN - self.line_height
+            body = f"BT\n/F1 {self.font_size} Tf\n{MARGIN} {top} Td\n".encode("ascii")
+            body += "\n".join(self.lines).encode("latin-1", "replace") + b"\nET"
+            self.writer.add_page(body)
+            self.lines = []
+
+    def _add_line(self, operators):
+        if len(self.lines) >= self.rows_per_page:
+            self._flush()
+        self.lines.append(f"{operators} 0 -{self.line_height} Td")
+
+    def title(self, text):
+        self._add_line(f"/F2 {TITLE_SIZE} Tf ({escape_text(text)}) Tj /F1 {self.font_size} Tf")
+
+    def text(self, text):
+        self._add_line(f"({escape_text(text)}) Tj")
+
+    def table(self, columns, widths, header=True, batch_pages=BATCH_PAGES):
+        # columns maps a header to an array-like of values; widths are column widths in points
+        names = list(columns)
+        total_width = sum(widths)
+        if header:
+            cells = " ".join(f"({escape_text(name)}) Tj {width} 0 Td" for name, width in zip(names, widths))
+            self._add_line(f"/F2 {self.font_size} Tf {cells} -{total_width} 0 Td /F1 {self.font_size} Tf")
+
+        values = [pd.Series(columns[name]).reset_index(drop=True) for name in names]
+        row_count = len(values[0]) if values else 0
+        batch_rows = self.rows_per_page * batch_pages
+        for start in range(0, row_count, batch_rows):
+            # Each row: show every cell, step right by its width, then return to the margin one line down
+            rows = pd.Series("", index=range(min(batch_rows, row_count - start)), dtype=object)
+            for column, width in zip(values, widths):
+                cells = _escape_column(column.iloc[start:start + batch_rows]).reset_index(drop=True)
+                rows = rows + "(" + cells + f") Tj {width} 0 Td "
+            rows = (rows + f"-{total_width} -{self.line_height} Td").tolist()
+
+            # Top up the current page, then fill whole pages straight from the batch
+            position = 0
+            while position < len(rows):
+                if len(self.lines) >= self.rows_per_page:
+                    self._flush()
+                take = self.rows_per_page - len(self.lines)
+                self.lines.extend(rows[position:position + take])
+                position += take
+
+    def close(self):
+        # Writes the last page and the trailer; returns the page count
+        self._flush()
+        if not self.writer.page_ids:
+            self.writer.add_page(b"")
+        return self.writer.close()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""Level-of-detail data reduction for the large scatter and violin plots.
+
+Above a configurable row cap the scatter plot is drawn from a stratified
+random sample (every hue group keeps its share of points, and small groups are
+kept whole), or replaced by a hexbin density plot.  Violins are drawn from
+per-group summaries instead of the raw rows: a Gaussian KDE evaluated on a
+fixed grid (computed by binning, so it is linear in the number of rows) plus
+the quartiles and whiskers for the inner box.  The summaries are tiny, so they
+hash and render quickly, and the result looks like seaborn's own violins.
+
+Sampling uses a fixed seed, so the same data always produces the same sample
+and chart cache key.
+"""
+
+import numpy as np
+import pandas as pd
+
+SCATTER_MAX_POINTS = 20000
+VIOLIN_MAX_ROWS = 50000
+MIN_POINTS_PER_GROUP = 50
+KDE_GRID_POINTS = 100
+KDE_CUT = 2  # grid extends this many bandwidths past the data, as in seaborn
+SAMPLE_SEED = 0
+
+
+# Function to take a stratified sample of at most about max_points rows, keeping every hue group
+def stratified_sample(df, max_points=SCATTER_MAX_POINTS, by=None, min_per_group=MIN_POINTS_PER_GROUP, seed=SAMPLE_SEED):
+    if len(df) <= max_points:
+        return df
+    rng = np.random.default_rng(seed)
+    if by is None:
+        return df.iloc[np.sort(rng.choice(len(df), max_points, replace=False))]
+    codes, _ = pd.factorize(df[by], use_na_sentinel=False)
+    counts = np.bincount(codes)
+    quota = np.maximum(np.minimum(counts, min_per_group), np.round(counts * max_points / len(df)))
+    # A random rank within each group; keep the first `quota` rows of every group
+    ranks = pd.Series(rng.random(len(df))).groupby(codes).rank(method="first").to_numpy()
+    return df.iloc[np.flatnonzero(ranks <= quota[codes])]
+
+
+# Function to order groups the way seaborn does: category order for categoricals, else first appearance
+def group_order(values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        present = set(values.dropna().unique())
+        return [category for category in values.cat.categories if category in present]
+    return list(pd.unique(values.dropna()))
+
+
+# Function to evaluate a Gaussian KDE of `values` on `grid` by binning (Scott's bandwidth)
+def binned_kde(values, grid, bandwidth):
+    step = grid[1] - grid[0]
+    counts, _ = np.histogram(values, bins=len(grid), range=(grid[0] - step / 2, grid[-1] + step / 2))
+    sigma = bandwidth / step
+    radius = int(np.ceil(4 * sigma))
+    kernel = np.exp(-0.5 * (np.arange(-radius, radius + 1) / sigma) ** 2)
+    density = np.convolve(counts, kernel)[radius:radius + len(grid)]
+    return density / (density.sum() * step)
+
+
+# Function to summarize each group's distribution for violin plots (long format, one row per grid point)
+def violin_summary(df, x, y, grid_points=KDE_GRID_POINTS, cut=KDE_CUT):
+    frames = []
+    data = df[[x, y]].dropna()
+    groups = dict(list(data.groupby(x, observed=True, sort=False)[y]))
+    for position, name in enumerate(group_order(data[x])):
+        values = groups[name].to_numpy(dtype=float)
+        q1, median, q3 = np.percentile(values, [25, 50, 75])
+        iqr = q3 - q1
+        # Whiskers end at the most extreme values within 1.5 IQR, like seaborn's inner box
+        low = values[values >= q1 - 1.5 * iqr].min()
+        high = values[values <= q3 + 1.5 * iqr].max()
+        std = values.std(ddof=1) if len(values) > 1 else 0.0
+        bandwidth = std * len(values) ** (-1 / 5) if std > 0 else 0.0
+        if bandwidth > 0:
+            grid = np.linspace(values.min() - cut * bandwidth, values.max() + cut * bandwidth, grid_points)
+            density = binned_kde(values, grid, bandwidth)
+        else:
+            grid, density = np.array([values.min()]), np.array([1.0])
+        frames.append(pd.DataFrame({
+            x: name, 'position': position, 'coord': grid, 'density': density,
+            'q1': q1, 'median': median, 'q3': q3, 'whisker_low': low, 'whisker_high': high, 'n': len(values),
+        }))
+    if not frames:
+        return pd.DataFrame(columns=[x, 'position', 'coord', 'density', 'q1', 'median', 'q3', 'whisker_low', 'whisker_high', 'n'])
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""Delivery transports for the scheduled stock reports.
+
+A transport has a single ``send(message)`` method taking an
+``email.message.Message``.  ``SmtpTransport`` delivers through an SMTP relay
+and ``FileTransport`` drops ``.eml`` files into an outbox directory.
+``transport_from_env`` picks one from ``REPORT_TRANSPORT`` and the
+``REPORT_SMTP_*`` variables, so credentials live in the environment rather
+than in the code.
+
+``LocalSMTPServer`` is a small in-process SMTP stand-in that accepts mail on
+localhost and writes every message to a directory; point ``SmtpTransport`` at
+it to exercise the SMTP path without a real mail server.
+"""
+
+import os
+import smtplib
+import socketserver
+import threading
+import time
+import uuid
+
+
+class SmtpTransport:
+    """Sends messages through an SMTP server."""
+
+    def __init__(self, host, port=587, username=None, password=None, starttls=True, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+
+    def send(self, message):
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as server:
+            if self.starttls:
+                server.starttls()
+            if self.username:
+                server.login(self.username, self.password)
+            server.send_message(message)
+
+
+# Function to write raw message bytes to a new .eml file in a directory
+def write_eml(directory, data):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.eml")
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+class FileTransport:
+    """Writes each message as an .eml file into a directory."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def send(self, message):
+        return write_eml(self.directory, message.as_bytes())
+
+
+# Function to build the transport configured in the environment
+def transport_from_env(environ=None):
+    environ = os.environ if environ is None else environ
+    kind = environ.get("REPORT_TRANSPORT", "file").lower()
+    if kind == "smtp":
+        return SmtpTransport(
+            host=environ.get("REPORT_SMTP_HOST", "localhost"),
+            port=int(environ.get("REPORT_SMTP_PORT", "587")),
+            username=environ.get("REPORT_SMTP_USER") or None,
+            password=environ.get("REPORT_SMTP_PASSWORD") or None,
+            starttls=environ.get("REPORT_SMTP_STARTTLS", "1").lower() not in ("0", "false", "no"),
+        )
+    if kind == "file":
+        return FileTransport(environ.get("REPORT_OUTBOX_DIR", "report_outbox"))
+    raise ValueError(f"Unknown REPORT_TRANSPORT: {kind}")
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    # Just enough of RFC 5321 for smtplib: HELO/EHLO, MAIL, RCPT, DATA, RSET, NOOP, QUIT
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode("ascii"))
+
+    def handle(self):
+        self.reply("220 localhost report stand-in ready")
+        recipients = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("utf-8", "replace").strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250 localhost")
+            elif verb == "MAIL":
+                recipients = []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command.split(":", 1)[-1].strip().strip("<>"))
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data in (b".\r\n", b".\n"):
+                        break
+                    # Undo dot-stuffing
+                    lines.append(data[1:] if data.startswith(b"..") else data)
+                self.server.store(b"".join(lines), recipients)
+                self.reply("250 OK")
+            elif verb in ("RSET", "NOOP"):
+                recipients = []
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """SMTP stand-in for testing: accepts mail on localhost and saves it to a directory."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, directory, host="127.0.0.1", port=0):
+        super().__init__((host, port), _SMTPHandler)
+        self.directory = directory
+        self.messages = []
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def store(self, data, recipients):
+        self.messages.append((recipients, write_eml(self.directory, data)))
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="local-smtp", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
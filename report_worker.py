@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""Standalone scheduler that renders and delivers the inventory stock reports.
+
+Run it as its own process next to the Streamlit app:
+
+    python report_worker.py run
+
+Jobs live in one SQLite table keyed by job name, so registering a job twice
+updates it instead of adding a duplicate, and several workers can share the
+table: each due job is claimed inside a write transaction before it runs.
+Weekly jobs are rescheduled after each run; one-off "send now" jobs queued by
+the app are deleted once delivered.  The report PDF is rendered at most once
+per sheet snapshot and day, however many jobs are due.
+
+Delivery goes through the transport configured by ``REPORT_TRANSPORT`` (see
+``report_transport.py``).  For a local end-to-end test, start the SMTP
+stand-in with ``python report_worker.py smtp-stub --port 1025`` and run the
+worker with ``REPORT_TRANSPORT=smtp REPORT_SMTP_PORT=1025
+REPORT_SMTP_STARTTLS=0``.
+"""
+
+import argparse
+import datetime
+import logging
+import os
+import socket
+import sqlite3
+import time
+
+import pandas as pd
+
+from inventory_report import REPORT_CACHE_DIR, SHEET_SOURCES, build_report_message, cached_report, prepare_sheet
+from report_transport import LocalSMTPServer, transport_from_env
+from sheet_snapshot import SnapshotCache
+
+JOBS_DB = os.environ.get("REPORT_JOBS_DB", "report_jobs.db")
+POLL_SECONDS = 30
+CLAIM_TIMEOUT_SECONDS = 15 * 60
+RETRY_DELAY_SECONDS = 10 * 60
+MAX_ATTEMPTS = 5
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+log = logging.getLogger("report_worker")
+
+# The weekly report the Reports page used to register on every rerun
+DEFAULT_JOBS = [
+    ("weekly-stock-report", os.environ.get("REPORT_DEFAULT_RECIPIENT", "recipient@example.com"), "monday", "08:00"),
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS report_jobs (
+    name TEXT PRIMARY KEY,
+    recipient TEXT NOT NULL,
+    weekday INTEGER,
+    at_time TEXT,
+    next_run REAL NOT NULL,
+    last_run REAL,
+    last_status TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    claimed_by TEXT,
+    claimed_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_report_jobs_next_run ON report_jobs (next_run);
+"""
+
+
+# Function to open the job table
+def connect(db_path=JOBS_DB):
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+# Function to compute the next weekly run strictly after `after` (local time)
+def next_weekly_run(weekday, at_time, after=None):
+    after = datetime.datetime.fromtimestamp(after if after is not None else time.time())
+    hour, minute = (int(part) for part in at_time.split(":"))
+    candidate = after.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    candidate += datetime.timedelta(days=(weekday - after.weekday()) % 7)
+    if candidate <= after:
+        candidate += datetime.timedelta(days=7)
+    return candidate.timestamp()
+
+
+# Function to add or update a weekly job; the name is the deduplication key
+def upsert_weekly_job(db_path, name, recipient, weekday, at_time, replace=True):
+    weekday = WEEKDAYS.index(weekday.lower()) if isinstance(weekday, str) else int(weekday)
+    next_run = next_weekly_run(weekday, at_time)
+    conflict = (
+        "DO UPDATE SET recipient = excluded.recipient, weekday = excluded.weekday, "
+        "at_time = excluded.at_time, next_run = excluded.next_run"
+        if replace else "DO NOTHING"
+    )
+    conn = connect(db_path)
+    try:
+        conn.execute(
+            "INSERT INTO report_jobs (name, recipient, weekday, at_time, next_run) VALUES (?, ?, ?, ?, ?) "
+            f"ON CONFLICT(name) {conflict}",
+            (name, recipient, weekday, at_time, next_run),
+        )
+    finally:
+        conn.close()
+
+
+# Function to queue a one-off report; repeated requests for the same recipient collapse into one job
+def enqueue_send(db_path, recipient):
+    conn = connect(db_path)
+    try:
+        conn.execute(
+            "INSERT INTO report_jobs (name, recipient, next_run) VALUES (?, ?, ?) ON CONFLICT(name) DO NOTHING",
+            (f"once:{recipient}", recipient, time.time()),
+        )
+    finally:
+        conn.close()
+
+
+# Function to list jobs as a DataFrame (for the app and the CLI)
+def list_jobs(db_path=JOBS_DB):
+    conn = connect(db_path)
+    try:
+        jobs = pd.read_sql_query("SELECT * FROM report_jobs ORDER BY next_run", conn)
+    finally:
+        conn.close()
+    jobs['weekday'] = jobs['weekday'].map(lambda day: WEEKDAYS[int(day)].title() if pd.notna(day) else "Once")
+    for column in ('next_run', 'last_run'):
+        jobs[column] = jobs[column].map(lambda ts: datetime.datetime.fromtimestamp(ts) if pd.notna(ts) else None)
+    return jobs
+
+
+# Function to remove a job by name
+def remove_job(db_path, name):
+    conn = connect(db_path)
+    try:
+        return conn.execute("DELETE FROM report_jobs WHERE name = ?", (name,)).rowcount > 0
+    finally:
+        conn.close()
+
+
+# Function to claim every due job for this worker inside one write transaction
+def claim_due_jobs(conn, worker_id, now=None):
+    now = time.time() if now is None else now
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        jobs = conn.execute(
+            "SELECT * FROM report_jobs WHERE next_run <= ? AND (claimed_at IS NULL OR claimed_at < ?)",
+            (now, now - CLAIM_TIMEOUT_SECONDS),
+        ).fetchall()
+        conn.executemany(
+            "UPDATE report_jobs SET claimed_by = ?, claimed_at = ? WHERE name = ?",
+            [(worker_id, now, job['name']) for job in jobs],
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return jobs
+
+
+# Function to record the outcome of a job and schedule its next run
+def finish_job(conn, job, error=None, now=None):
+    now = time.time() if now is None else now
+    one_off = job['weekday'] is None
+    if error is None:
+        if one_off:
+            conn.execute("DELETE FROM report_jobs WHERE name = ?", (job['name'],))
+            return
+        next_run, attempts, status = next_weekly_run(job['weekday'], job['at_time'], now), 0, "sent"
+    else:
+        attempts = job['attempts'] + 1
+        status = f"error: {error}"
+        if one_off and attempts >= MAX_ATTEMPTS:
+            conn.execute("DELETE FROM report_jobs WHERE name = ?", (job['name'],))
+            return
+        # Weekly jobs retry until they succeed or their next regular slot comes round
+        next_run = now + RETRY_DELAY_SECONDS
+        if not one_off:
+            next_run = min(next_run, next_weekly_run(job['weekday'], job['at_time'], now))
+    conn.execute(
+        "UPDATE report_jobs SET next_run = ?, last_run = ?, last_status = ?, attempts = ?, "
+        "claimed_by = NULL, claimed_at = NULL WHERE name = ?",
+        (next_run, now, status, attempts, job['name']),
+    )
+
+
+class ReportRenderer:
+    """Renders the report PDF from the latest sheets, reusing the cached copy per snapshot version."""
+
+    def __init__(self, sources=None, cache_dir=REPORT_CACHE_DIR):
+        self.cache = SnapshotCache(sources or SHEET_SOURCES, parse=prepare_sheet)
+        self.cache_dir = cache_dir
+
+    def render(self):
+        # Conditional requests make this cheap when the sheets have not changed
+        snapshot = self.cache.refresh()
+        sales_df, factory_df = snapshot.frames["sales"], snapshot.frames["factory"]
+        return cached_report(snapshot.version, sales_df, factory_df, cache_dir=self.cache_dir)
+
+
+# Function to run every due job once; returns the number of jobs processed
+def run_pending(db_path, transport, renderer, sender, worker_id=None, now=None):
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    conn = connect(db_path)
+    try:
+        jobs = claim_due_jobs(conn, worker_id, now)
+        for job in jobs:
+            try:
+                transport.send(build_report_message(renderer.render(), sender, job['recipient']))
+                finish_job(conn, job, now=now)
+                log.info("Sent %s to %s", job['name'], job['recipient'])
+            except Exception as e:
+                finish_job(conn, job, error=e, now=now)
+                log.exception("Failed %s", job['name'])
+        return len(jobs)
+    finally:
+        conn.close()
+
+
+# Function to poll the job table until interrupted
+def run_forever(db_path, transport, renderer, sender, poll_seconds=POLL_SECONDS):
+    for name, recipient, weekday, at_time in DEFAULT_JOBS:
+        upsert_weekly_job(db_path, name, recipient, weekday, at_time, replace=False)
+    while True:
+        run_pending(db_path, transport, renderer, sender)
+        time.sleep(poll_seconds)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scheduled inventory report worker")
+    parser.add_argument("--db", default=JOBS_DB, help="job table database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="poll for due jobs and deliver them")
+    run.add_argument("--poll", type=float, default=POLL_SECONDS)
+    commands.add_parser("once", help="deliver the jobs that are due now and exit")
+    add = commands.add_parser("add", help="add or update a weekly job")
+    add.add_argument("name")
+    add.add_argument("recipient")
+    add.add_argument("--weekday", default="monday", choices=WEEKDAYS)
+    add.add_argument("--at", default="08:00")
+    send = commands.add_parser("send", help="queue a one-off report")
+    send.add_argument("recipient")
+    remove = commands.add_parser("remove", help="remove a job")
+    remove.add_argument("name")
+    commands.add_parser("list", help="list jobs")
+    stub = commands.add_parser("smtp-stub", help="run a local SMTP stand-in that saves mail to a directory")
+    stub.add_argument("--port", type=int, default=1025)
+    stub.add_argument("--dir", default="smtp_stub_mail")
+    args = parser.parse_args(argv)
+
+    if args.command in ("run", "once"):
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+        transport = transport_from_env()
+        sender = os.environ.get("REPORT_SENDER") or os.environ.get("REPORT_SMTP_USER") or "reports@localhost"
+        renderer = ReportRenderer()
+        if args.command == "run":
+            run_forever(args.db, transport, renderer, sender, args.poll)
+        else:
+            print(f"Processed {run_pending(args.db, transport, renderer, sender)} job(s)")
+    elif args.command == "add":
+        upsert_weekly_job(args.db, args.name, args.recipient, args.weekday, args.at)
+    elif args.command == "send":
+        enqueue_send(args.db, args.recipient)
+    elif args.command == "remove":
+        if not remove_job(args.db, args.name):
+            parser.exit(1, f"No job named {args.name}\n")
+    elif args.command == "list":
+        print(list_jobs(args.db).to_string(index=False))
+    elif args.command == "smtp-stub":
+        server = LocalSMTPServer(args.dir, port=args.port)
+        print(f"SMTP stand-in listening on 127.0.0.1:{server.port}, saving mail to {args.dir}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,11 @@
 """sales.ipynb"""
 
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from io import StringIO
+from data_loader import load_uploaded_file, preview_uploaded_file
+from sales_summary import REQUIRED_COLUMNS, STREAM_THRESHOLD_BYTES, load_sales_summary
+from ledger_schema import MONTHLY_SALE, EXPORT_SALE, memory_report_text, plain_keys
+from chart_render import chart_spec, chart_image, chart_images
 
 # Set Streamlit page layout to wide for better dashboard visibility (MOVED TO FIRST COMMAND)
 st.set_page_config(layout="wide")
@@ -20,36 +21,32 @@ analysis_type = st.selectbox("Select the type of analysis", ["Monthly Sale", "Ex
 
 if uploaded_file:
     try:
-        # Read uploaded file based on file type
-        if uploaded_file.name.endswith('.csv'):
-            data = pd.read_csv(uploaded_file)
-        else:
-            data = pd.read_excel(uploaded_file)
-
         if analysis_type == "Monthly Sale":
+            # Large CSV exports are summarized in chunks instead of being loaded whole
+            out_of_core = False
+            if uploaded_file.name.endswith('.csv'):
+                out_of_core = st.checkbox("Out-of-core mode (stream the CSV in chunks)",
+                                          value=uploaded_file.size > STREAM_THRESHOLD_BYTES)
+            # The preview shows the upload as it is, every column included; only its first rows are read
+            preview = preview_uploaded_file(uploaded_file)
+
             st.write("### Monthly Sale Analysis")
             st.write("### First 10 rows of the dataset:")  # FIXED STRING ISSUE
-            st.dataframe(data.head(10))
+            st.dataframe(preview)
 
             # Define required columns for analysis
-            required_columns = ['DocDate', 'type', 'parName', 'CATEGORY', 'CatCd', 'weight', 'noPcs']
-            if not all(col in data.columns for col in required_columns):
-                st.error(f"The dataset must contain these columns: {required_columns}")
+            if not all(col in preview.columns for col in REQUIRED_COLUMNS):
+                st.error(f"The dataset must contain these columns: {REQUIRED_COLUMNS}")
             else:
-                # Exclude specific unwanted categories
-                excluded_categories = ['ST', 'LOOSE PCS', 'PARA BIDS', 'Langadi', 'PROCESS LOSS',
-                                       'SCRAP PCC', 'BALL CHAIN', 'SIGNING TAR', 'Fine']
-                df = data[~data['CATEGORY'].isin(excluded_categories)]
+                if not out_of_core:
+                    # The declared schema loads the columns with compact dtypes (cached for the summary)
+                    data = load_uploaded_file(uploaded_file, schema=MONTHLY_SALE)
+                    st.caption(memory_report_text(data.attrs['memory_report']))
 
-                # Aggregate weight data for parties and categories
-                party_weight_summary = df.groupby('parName')['weight'].sum().reset_index()
-                party_weight_summary['Rank'] = party_weight_summary['weight'].rank(
-                    ascending=False, method='min')
-                party_weight_summary = party_weight_summary.sort_values(by='weight', ascending=False)
-
-                CatCd_summary = df.groupby('CatCd')['weight'].sum().reset_index()
-                CatCd_summary['Rank'] = CatCd_summary['weight'].rank(ascending=False, method='min')
-                CatCd_summary = CatCd_summary.sort_values(by='weight', ascending=False)
+                # Excluded categories are dropped and weights summed per party, category and date (cached per file)
+                summary = load_sales_summary(uploaded_file, out_of_core=out_of_core)
+                party_weight_summary = summary.ranking('parName')
+                CatCd_summary = summary.ranking('CatCd')
 
                 # Display KPI metrics
                 st.write("### KPI Metrics")
@@ -59,7 +56,7 @@ if uploaded_file:
                 with col2:
                     st.metric("Total Categories", len(CatCd_summary))
                 with col3:
-                    st.metric("Total Weight", f"{df['weight'].sum():.2f}")
+                    st.metric("Total Weight", f"{summary.total_weight:.2f}")
 
                 # Dropdown to select a party for detailed insights
                 party_name = st.selectbox("Select a party name:", options=party_weight_summary['parName'].unique())
@@ -69,47 +66,42 @@ if uploaded_file:
                     st.write(f"**Party Name:** {party_name}")
                     st.write(f"**Total Weight:** {party_details['weight'].values[0]:.2f}")
 
+                # Charts are cached by (data, spec); new ones render in parallel off the script thread
+                top_parties, bottom_parties, top_categories, bottom_categories = chart_images([
+                    (party_weight_summary.head(10), chart_spec('bar', x='weight', y='parName', palette='Blues_r', title='Top 10 Parties by Weight')),
+                    (party_weight_summary.tail(5), chart_spec('bar', x='weight', y='parName', palette='Reds_r', title='Bottom 5 Parties by Weight')),
+                    (CatCd_summary.head(10), chart_spec('bar', x='weight', y='CatCd', palette='pastel', title='Top 10 Categories by Weight')),
+                    (CatCd_summary.tail(5), chart_spec('bar', x='weight', y='CatCd', palette='Oranges_r', title='Bottom 5 Categories by Weight')),
+                ])
+
                 # Visualization for top and bottom parties
                 col1, col2 = st.columns(2)
                 with col1:
                     st.write("### Top 10 Parties by Weight")
-                    fig1, ax1 = plt.subplots()
-                    sns.barplot(x='weight', y='parName', data=party_weight_summary.head(10), palette='Blues_r', ax=ax1)
-                    ax1.set_title('Top 10 Parties by Weight')
-                    st.pyplot(fig1)
+                    st.image(top_parties, use_container_width=True)
                 with col2:
                     st.write("### Bottom 5 Parties by Weight")
-                    fig2, ax2 = plt.subplots()
-                    sns.barplot(x='weight', y='parName', data=party_weight_summary.tail(5), palette='Reds_r', ax=ax2)
-                    ax2.set_title('Bottom 5 Parties by Weight')
-                    st.pyplot(fig2)
+                    st.image(bottom_parties, use_container_width=True)
 
                 # Visualization for top and bottom categories
                 col3, col4 = st.columns(2)
                 with col3:
                     st.write("### Top 10 Categories by Weight")
-                    fig3, ax3 = plt.subplots()
-                    sns.barplot(x='weight', y='CatCd', data=CatCd_summary.head(10), palette='pastel', ax=ax3)
-                    ax3.set_title('Top 10 Categories by Weight')
-                    st.pyplot(fig3)
+                    st.image(top_categories, use_container_width=True)
                 with col4:
                     st.write("### Bottom 5 Categories by Weight")
-                    fig4, ax4 = plt.subplots()
-                    sns.barplot(x='weight', y='CatCd', data=CatCd_summary.tail(5), palette='Oranges_r', ax=ax4)
-                    ax4.set_title('Bottom 5 Categories by Weight')
-                    st.pyplot(fig4)
+                    st.image(bottom_categories, use_container_width=True)
 
-                # Convert document date column to datetime format for time-based analysis
+                # Document dates are already parsed by the summary
                 st.write("### Total Weight Over Time")
-                df['DocDate'] = pd.to_datetime(df['DocDate'])
-                time_series = df.groupby('DocDate')['weight'].sum().reset_index()
-                fig5, ax5 = plt.subplots()
-                sns.lineplot(x='DocDate', y='weight', data=time_series, marker='o', color='blue', ax=ax5)
-                ax5.set_title('Total Weight Over Time')
-                st.pyplot(fig5)
+                time_series = summary.time_series()
+                st.image(chart_image(time_series, chart_spec('line', x='DocDate', y='weight', marker='o', color='blue', title='Total Weight Over Time')), use_container_width=True)
 
         elif analysis_type == "Export Sale":
+            # Read uploaded file once per content hash; reruns are served from the cache
+            data = load_uploaded_file(uploaded_file, schema=EXPORT_SALE)
             st.write("### Export Sale Analysis")
+            st.caption(memory_report_text(data.attrs['memory_report']))
             st.write("### First 10 rows of the dataset:")  # FIXED STRING ISSUE
             st.dataframe(data.head(10))
 
@@ -131,36 +123,28 @@ if uploaded_file:
 
             # Time-based Analysis
             st.write("### Weight and Quantity Over Time")
-            data['DATE'] = pd.to_datetime(data['DATE'])
             time_summary = data.groupby('DATE').agg({'WEIGHT': 'sum', 'QTY': 'sum'}).reset_index()
-            fig1, ax1 = plt.subplots(figsize=(10, 6))
-            sns.lineplot(x='DATE', y='WEIGHT', data=time_summary, marker='o', label='Weight')
-            sns.lineplot(x='DATE', y='QTY', data=time_summary, marker='o', label='Quantity')
-            ax1.set_title("Weight and Quantity Over Time")
-            plt.xlabel("Date")
-            plt.ylabel("Total")
-            plt.legend()
-            st.pyplot(fig1)
-
-            # Party-based Analysis
-            st.write("### Top and Bottom Parties by Weight")
-            party_summary = data.groupby('PARTY')['WEIGHT'].sum().reset_index()
+            # PARTY is categorical: group observed parties only, and plot plain names so seaborn adds no empty bars
+            party_summary = plain_keys(data.groupby('PARTY', observed=True)['WEIGHT'].sum().reset_index())
             top_10_parties = party_summary.sort_values(by='WEIGHT', ascending=False).head(10)
             bottom_5_parties = party_summary.sort_values(by='WEIGHT').head(5)
+            time_chart, top_chart, bottom_chart = chart_images([
+                (time_summary, chart_spec('line', x='DATE', series=[('WEIGHT', 'Weight'), ('QTY', 'Quantity')], marker='o',
+                                          title="Weight and Quantity Over Time", xlabel="Date", ylabel="Total", legend=True, figsize=(10, 6))),
+                (top_10_parties, chart_spec('bar', x='WEIGHT', y='PARTY', palette='Blues_r', title="Top 10 Parties by Weight", figsize=(8, 6))),
+                (bottom_5_parties, chart_spec('bar', x='WEIGHT', y='PARTY', palette='Reds_r', title="Bottom 5 Parties by Weight", figsize=(8, 6))),
+            ])
+            st.image(time_chart, use_container_width=True)
 
+            # Party-based Analysis
+            st.write("### Top and Bottom Parties by Weight")
             col1, col2 = st.columns(2)
             with col1:
                 st.write("#### Top 10 Parties")
-                fig2, ax2 = plt.subplots(figsize=(8, 6))
-                sns.barplot(x='WEIGHT', y='PARTY', data=top_10_parties, palette='Blues_r')
-                ax2.set_title("Top 10 Parties by Weight")
-                st.pyplot(fig2)
+                st.image(top_chart, use_container_width=True)
             with col2:
                 st.write("#### Bottom 5 Parties")
-                fig3, ax3 = plt.subplots(figsize=(8, 6))
-                sns.barplot(x='WEIGHT', y='PARTY', data=bottom_5_parties, palette='Reds_r')
-                ax3.set_title("Bottom 5 Parties by Weight")
-                st.pyplot(fig3)
+                st.image(bottom_chart, use_container_width=True)
     except Exception as e:
         st.error(f"An error occurred while processing the file: {e}")
 else:
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""Monthly sales summaries, in memory or streamed from a CSV in chunks.
+
+The monthly sales dashboards only need per-party, per-category and per-date
+sums of ``weight`` after dropping the excluded categories.  For exports too
+large to load whole, ``summarize_csv`` reads the CSV in chunks with only the
+needed columns (keys as categoricals, weight as float), filters and groups
+each chunk, and merges the partial sums, so memory grows with the number of
+groups rather than the number of rows.
+
+Both modes walk the rows in the same chunks and go through the same
+partial-sum and merge steps, so they add the weights in the same order and
+produce the same ``SalesSummary``.  Keys read as text (streamed chunks, or
+categoricals from ``ledger_schema.MONTHLY_SALE``) are converted once at the
+end, the way ``read_csv`` would have typed them, and document dates are
+parsed once per distinct value.
+"""
+
+import pandas as pd
+
+from data_loader import file_hash, frame_cache, load_uploaded_file
+from ledger_schema import MONTHLY_SALE
+
+REQUIRED_COLUMNS = MONTHLY_SALE.required
+EXCLUDED_CATEGORIES = ['ST', 'LOOSE PCS', 'PARA BIDS', 'Langadi', 'PROCESS LOSS',
+                       'SCRAP PCC', 'BALL CHAIN', 'SIGNING TAR', 'Fine']
+GROUP_KEYS = ['parName', 'CatCd', 'DocDate']
+SUMMARY_COLUMNS = GROUP_KEYS + ['CATEGORY', 'weight']
+
+CHUNK_ROWS = 200000
+# Partial sums are merged whenever this many are pending, bounding memory by groups, not rows
+MERGE_EVERY = 16
+# CSV uploads above this size default to out-of-core mode
+STREAM_THRESHOLD_BYTES = 100 * 1024 * 1024
+
+
+class SalesSummary:
+    """Weight totals per party, category code and document date for the kept rows."""
+
+    def __init__(self, party_weight, category_weight, weight_over_time, total_weight, rows):
+        self.party_weight = party_weight
+        self.category_weight = category_weight
+        self.weight_over_time = weight_over_time
+        self.total_weight = total_weight
+        self.rows = rows
+
+    def ranking(self, key):
+        # Summary table for 'parName' or 'CatCd': weight and rank, heaviest first
+        series = self.party_weight if key == 'parName' else self.category_weight
+        summary = series.rename_axis(key).reset_index(name='weight')
+        summary['Rank'] = summary['weight'].rank(ascending=False, method='min')
+        return summary.sort_values(by='weight', ascending=False)
+
+    def time_series(self):
+        return self.weight_over_time.rename_axis('DocDate').reset_index(name='weight')
+
+
+# Function to drop the excluded categories and sum one frame (or chunk) by every key
+def partial_sums(df):
+    kept = df[~df['CATEGORY'].isin(EXCLUDED_CATEGORIES)]
+    weight = kept['weight'].astype(float)
+    sums = {key: weight.groupby(kept[key], observed=True, sort=False).sum() for key in GROUP_KEYS}
+    return sums, weight.sum(), len(kept)
+
+
+# Function to merge partial sums into one, keeping them as (sums, total, rows)
+def merge_partials(partials):
+    sums = {}
+    for key in GROUP_KEYS:
+        # Each chunk has its own categories, so categorical keys are merged as plain values
+        pieces = [part[0][key] for part in partials]
+        merged = pd.concat([
+            piece.set_axis(piece.index.astype(object)) if isinstance(piece.index, pd.CategoricalIndex) else piece
+            for piece in pieces
+        ])
+        sums[key] = merged.groupby(level=0, sort=False).sum()
+    return sums, sum(part[1] for part in partials), sum(part[2] for part in partials)
+
+
+# Function to type streamed key values the way read_csv would have (numbers stay numbers)
+def infer_keys(index):
+    try:
+        return pd.Index(pd.to_numeric(index))
+    except (ValueError, TypeError):
+        return index
+
+
+# Function to sum chunks one by one, merging the pending partial sums as it goes
+def summarize_chunks(chunks):
+    pending = []
+    for chunk in chunks:
+        pending.append(partial_sums(chunk))
+        if len(pending) >= MERGE_EVERY:
+            pending = [merge_partials(pending)]
+    sums, total, rows = merge_partials(pending) if pending else ({key: pd.Series(dtype=float) for key in GROUP_KEYS}, 0.0, 0)
+
+    result = {}
+    for key, series in sums.items():
+        index = pd.to_datetime(series.index) if key == 'DocDate' else infer_keys(series.index)
+        # Different spellings of the same key (e.g. dates) collapse into one group
+        series = series.groupby(index).sum()
+        result[key] = series.sort_index().rename('weight')
+    return SalesSummary(result['parName'], result['CatCd'], result['DocDate'], total, rows)
+
+
+# Function to summarize a frame that is already in memory
+def summarize_frame(data, chunk_rows=CHUNK_ROWS):
+    # Same row chunks as the streaming path, so both add the weights in the same order
+    return summarize_chunks(data.iloc[start:start + chunk_rows] for start in range(0, len(data), chunk_rows))
+
+
+# Function to summarize a CSV file in chunks without loading it whole
+def summarize_csv(fileobj, chunk_rows=CHUNK_ROWS):
+    fileobj.seek(0)
+    dtypes = {column: 'category' for column in SUMMARY_COLUMNS if column != 'weight'}
+    dtypes['weight'] = 'float64'
+    chunks = pd.read_csv(fileobj, usecols=SUMMARY_COLUMNS, dtype=dtypes, chunksize=chunk_rows)
+    return summarize_chunks(chunks)
+
+
+# Function to get the monthly sales summary for an upload, cached per file contents
+def load_sales_summary(uploaded_file, out_of_core=False):
+    digest = file_hash(uploaded_file)
+
+    def build():
+        if out_of_core:
+            return summarize_csv(uploaded_file)
+        return summarize_frame(load_uploaded_file(uploaded_file, digest=digest, schema=MONTHLY_SALE))
+
+    return frame_cache.get_or_create((digest, 'sales_summary', out_of_core), build)
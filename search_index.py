@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""Prebuilt full-text search over a DataFrame snapshot.
+
+Each column is reduced to its distinct lowercase string values plus an
+inverted list of the rows holding each value.  A query scans the distinct
+values only (with Arrow string kernels when available) and then gathers the
+matching rows from the inverted lists, so a keystroke no longer stringifies
+every cell of every column.  Build one index per data snapshot and drop it
+when the sheet refreshes.
+"""
+
+import numpy as np
+import pandas as pd
+
+from categorize import STRING_DTYPE
+
+
+class _ColumnIndex:
+    """Distinct lowercase values of one column and the rows holding each value."""
+
+    def __init__(self, values):
+        # astype(str) matches the stringification the old per-cell search used
+        codes, uniques = pd.factorize(values.astype(str), use_na_sentinel=False)
+        self.values = pd.Series(uniques, dtype=object).astype(str).str.lower().astype(STRING_DTYPE)
+        order = np.argsort(codes, kind="stable")
+        self.rows = order
+        self.starts = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+
+    def rows_for(self, value_ids):
+        # Vectorized concatenation of the row ranges of every matching value
+        starts = self.starts[value_ids]
+        lengths = self.starts[value_ids + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64)
+        offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        return self.rows[offsets + np.arange(total)]
+
+    def search(self, query):
+        matches = self.values.str.contains(query, regex=False).to_numpy(dtype=bool, na_value=False)
+        return self.rows_for(np.flatnonzero(matches))
+
+
+class SearchIndex:
+    """Case-insensitive substring search over the rows of a DataFrame."""
+
+    def __init__(self, df, columns=None):
+        self.df = df
+        self.columns = list(columns) if columns is not None else list(df.columns)
+        self._columns = {column: _ColumnIndex(df[column]) for column in self.columns}
+
+    def search(self, query, columns=None):
+        # Returns the sorted row positions where any searched column contains the query
+        query = (query or "").lower()
+        if not query:
+            return np.arange(len(self.df))
+        hits = [self._columns[column].search(query) for column in (columns or self.columns)]
+        if not hits:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(hits))
+
+    def filter(self, query, columns=None):
+        return self.df.iloc[self.search(query, columns)]
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""Background-refreshed snapshot cache for Google Sheets CSV exports.
+
+Page renders read the latest snapshot and never wait on the network, except
+for the very first load.  A daemon worker re-downloads the sheets on an
+interval using conditional requests (ETag / Last-Modified), and falls back to
+comparing content hashes when the server does not support them.  A sheet is
+only re-parsed when its content actually changed, and a failed refresh keeps
+serving the previous snapshot (stale-while-revalidate).
+
+All sheets are downloaded concurrently over one pooled ``requests`` session
+with timeouts and retries, so a cold start takes as long as the slowest sheet
+rather than the sum of all of them.
+
+The URLs are plain parameters, so the cache can be pointed at a local HTTP
+server serving CSV files for testing.
+"""
+
+import hashlib
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from io import BytesIO
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+REFRESH_INTERVAL_SECONDS = 300
+REQUEST_TIMEOUT_SECONDS = 30
+MAX_RETRIES = 3
+MAX_CONCURRENT_FETCHES = 8
+
+
+# Function to build a pooled HTTP session that retries transient failures
+def make_session(retries=MAX_RETRIES, pool_size=MAX_CONCURRENT_FETCHES):
+    retry = Retry(
+        total=retries,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET"],
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# Function to download several CSV exports at once, returning {name: DataFrame}
+def fetch_csv_frames(urls, parse=None, on_error=None, session=None, timeout=REQUEST_TIMEOUT_SECONDS):
+    # on_error(name, exception) may return a fallback frame; without it the first error is raised
+    session = session or make_session()
+    parse = parse or (lambda name, df: df)
+
+    def fetch_one(name):
+        try:
+            response = session.get(urls[name], timeout=timeout)
+            response.raise_for_status()
+            return parse(name, pd.read_csv(BytesIO(response.content)))
+        except Exception as e:
+            if on_error is None:
+                raise
+            return on_error(name, e)
+
+    with ThreadPoolExecutor(max_workers=min(len(urls), MAX_CONCURRENT_FETCHES) or 1) as pool:
+        futures = {name: pool.submit(fetch_one, name) for name in urls}
+        return {name: future.result() for name, future in futures.items()}
+
+
+@dataclass
+class Snapshot:
+    """A set of parsed sheets plus a version derived from their content."""
+
+    version: str
+    frames: dict
+    fetched_at: float
+    content_hashes: dict = field(default_factory=dict)
+    derived: dict = field(default_factory=dict, repr=False)
+    _derive_lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+    _building: dict = field(default_factory=dict, repr=False, compare=False)
+
+    def derive(self, key, build):
+        # Memoize a value computed from this snapshot; a refresh starts with an empty memo.
+        # build() runs outside the lock (so it may derive other keys); concurrent callers
+        # of the same key wait for the one build in flight instead of repeating it.
+        with self._derive_lock:
+            if key in self.derived:
+                return self.derived[key]
+            pending = self._building.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._building[key] = Future()
+        if not owner:
+            return pending.result()
+
+        try:
+            value = build()
+        except BaseException as e:
+            with self._derive_lock:
+                del self._building[key]
+            pending.set_exception(e)
+            raise
+        with self._derive_lock:
+            self.derived[key] = value
+            del self._building[key]
+        pending.set_result(value)
+        return value
+
+
+@dataclass
+class _SourceState:
+    etag: str = None
+    last_modified: str = None
+    content_hash: str = None
+    frame: pd.DataFrame = None
+
+
+class SnapshotCache:
+    """Serves the latest sheet snapshot and refreshes it in a background thread."""
+
+    def __init__(self, sources, parse=None, refresh_interval=REFRESH_INTERVAL_SECONDS,
+                 timeout=REQUEST_TIMEOUT_SECONDS, session=None):
+        # sources maps a sheet name to its CSV export URL; parse(name, df) prepares each frame
+        self.sources = dict(sources)
+        self.parse = parse or (lambda name, df: df)
+        self.refresh_interval = refresh_interval
+        self.timeout = timeout
+        self.session = session or make_session()
+        self.snapshot = None
+        self.last_error = None
+        self._states = {name: _SourceState() for name in self.sources}
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._worker = None
+
+    def fetch(self, name):
+        # Returns (content, headers) or (None, headers) when the server answers 304 Not Modified
+        state = self._states[name]
+        headers = {}
+        if state.etag:
+            headers["If-None-Match"] = state.etag
+        if state.last_modified:
+            headers["If-Modified-Since"] = state.last_modified
+        response = self.session.get(self.sources[name], headers=headers, timeout=self.timeout)
+        if response.status_code == 304 and state.frame is not None:
+            return None, response.headers
+        response.raise_for_status()
+        return response.content, response.headers
+
+    def _update(self, name):
+        # Fetch one sheet and re-parse it if its content changed, without touching the
+        # committed state; returns (staged state, changed)
+        state = self._states[name]
+        content, headers = self.fetch(name)
+        staged = replace(
+            state,
+            etag=headers.get("ETag", state.etag),
+            last_modified=headers.get("Last-Modified", state.last_modified),
+        )
+        if content is None:
+            return staged, False
+        content_hash = hashlib.blake2b(content, digest_size=16).hexdigest()
+        if content_hash == state.content_hash and state.frame is not None:
+            return staged, False
+        staged.frame = self.parse(name, pd.read_csv(BytesIO(content)))
+        staged.content_hash = content_hash
+        return staged, True
+
+    def refresh(self):
+        # Download every sheet concurrently; publish a new snapshot only if some content changed
+        with self._refresh_lock:
+            workers = min(len(self.sources), MAX_CONCURRENT_FETCHES) or 1
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = dict(zip(self.sources, pool.map(self._update, self.sources)))
+            staged = {name: state for name, (state, _) in results.items()}
+            changed = any(changed for _, changed in results.values())
+
+            if changed or self.snapshot is None:
+                hashes = {name: staged[name].content_hash for name in self.sources}
+                version = hashlib.blake2b(
+                    "|".join(f"{name}={hashes[name]}" for name in sorted(hashes)).encode("utf-8"),
+                    digest_size=12,
+                ).hexdigest()
+                self.snapshot = Snapshot(
+                    version=version,
+                    frames={name: staged[name].frame for name in self.sources},
+                    fetched_at=time.time(),
+                    content_hashes=hashes,
+                )
+            else:
+                self.snapshot.fetched_at = time.time()
+            # Validators and hashes are committed only once every sheet succeeded and the
+            # snapshot is published; after a failure the next refresh refetches everything
+            self._states = staged
+            self.last_error = None
+            return self.snapshot
+
+    def _safe_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:  # keep serving the stale snapshot
+            self.last_error = e
+
+    def get(self):
+        # Only the first call blocks on the network; later calls return immediately
+        if self.snapshot is None:
+            return self.refresh()
+        if time.time() - self.snapshot.fetched_at > self.refresh_interval:
+            self.request_refresh()
+        return self.snapshot
+
+    def request_refresh(self):
+        # Ask the background worker to refresh now without waiting for it
+        if self._worker is not None and self._worker.is_alive():
+            self._wake.set()
+        elif not self._refresh_lock.locked():
+            threading.Thread(target=self._safe_refresh, daemon=True).start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.refresh_interval)
+            self._wake.clear()
+            if not self._stop.is_set():
+                self._safe_refresh()
+
+    def start(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._stop.clear()
+            self._worker = threading.Thread(target=self._run, name="sheet-snapshot-refresh", daemon=True)
+            self._worker.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""Columnar sidecar store for uploaded ledgers.
+
+The first time a ledger is uploaded it is parsed with pandas and written to an
+Arrow IPC file named after the content hash.  Date columns are stored already
+parsed and low-cardinality text columns are dictionary-encoded.  Later uploads
+of the same file memory-map the sidecar instead of re-parsing the workbook.
+"""
+
+import os
+import tempfile
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+SIDECAR_DIR = os.environ.get("LEDGER_SIDECAR_DIR", ".ledger_cache")
+MAX_STORE_BYTES = 2 * 1024 * 1024 * 1024
+
+# Text columns whose distinct values are at most this share of the rows get dictionary-encoded
+CATEGORICAL_RATIO = 0.5
+
+_lock = threading.Lock()
+
+
+# Function to build the sidecar file path for a key
+def sidecar_path(key, directory=SIDECAR_DIR):
+    return os.path.join(directory, f"{key}.arrow")
+
+
+# Function to pick the text columns worth dictionary-encoding
+def categorical_columns(df):
+    columns = []
+    for column in df.columns:
+        if pd.api.types.is_string_dtype(df[column]) and len(df) > 0:
+            if df[column].nunique(dropna=True) <= CATEGORICAL_RATIO * len(df):
+                columns.append(column)
+    return columns
+
+
+# Function to convert a parsed ledger to a dictionary-encoded Arrow table
+def to_arrow_table(df):
+    encoded = df.copy()
+    for column in categorical_columns(df):
+        encoded[column] = encoded[column].astype("category")
+    encoded.columns = [str(column) for column in encoded.columns]
+    return pa.Table.from_pandas(encoded, preserve_index=False)
+
+
+# Function to turn a sidecar table back into the frame the dashboards expect (categories: keep categoricals)
+def from_arrow_table(table, categories=False):
+    df = table.to_pandas()
+    if categories:
+        return df
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype(df[column].cat.categories.dtype)
+    return df
+
+
+# Function to write a sidecar atomically so readers never see a partial file
+def write_sidecar(key, df, directory=SIDECAR_DIR):
+    os.makedirs(directory, exist_ok=True)
+    table = to_arrow_table(df)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    try:
+        # Uncompressed so the file can be memory-mapped directly
+        feather.write_feather(table, tmp_path, compression="uncompressed")
+        os.replace(tmp_path, sidecar_path(key, directory))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    evict(directory=directory)
+
+
+# Function to memory-map a sidecar, returning None if it does not exist
+def read_sidecar(key, directory=SIDECAR_DIR, categories=False):
+    path = sidecar_path(key, directory)
+    try:
+        table = feather.read_table(path, memory_map=True)
+    except (FileNotFoundError, pa.ArrowInvalid):
+        return None
+    # Touch the file so eviction treats it as recently used
+    os.utime(path)
+    return from_arrow_table(table, categories)
+
+
+# Function to drop the least recently used sidecars once the store exceeds its size cap
+def evict(max_bytes=MAX_STORE_BYTES, directory=SIDECAR_DIR):
+    with _lock:
+        try:
+            names = [name for name in os.listdir(directory) if name.endswith(".arrow")]
+        except FileNotFoundError:
+            return
+        files = []
+        for name in names:
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        # Keep the newest sidecar even when it alone is over the cap
+        for _, size, path in sorted(files)[:-1]:
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+# Function to load a ledger from its sidecar, converting it on first upload
+def load_or_convert(key, parse, directory=SIDECAR_DIR, categories=False):
+    df = read_sidecar(key, directory, categories)
+    if df is not None:
+        return df
+    df = parse()
+    try:
+        write_sidecar(key, df, directory)
+    except (pa.ArrowException, OSError):
+        # Columns Arrow cannot represent (e.g. mixed types) simply skip the sidecar
+        pass
+    return df
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""Report worker end to end: job table, claims, rendering and delivery through LocalSMTPServer."""
+
+import email
+import functools
+import http.server
+import threading
+import time
+
+import pytest
+
+import report_worker
+from report_transport import LocalSMTPServer, SmtpTransport
+
+SHEET = (
+    "DATE,DESIGN NO,WT,DELIVERED\n"
+    "2024-01-02,R-101,12.5,\n"
+    "2024-02-03,E-202,3.25,\n"
+    "2024-03-04,P-303,7.0,out\n"
+)
+# A week ahead, so weekly jobs registered now are due as well
+LATER = time.time() + 8 * 24 * 3600
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def sheet_sources(tmp_path):
+    directory = tmp_path / "sheets"
+    directory.mkdir()
+    for name in ("sales", "factory"):
+        (directory / f"{name}.csv").write_text(SHEET)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory=str(directory)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield {name: f"{base_url}/{name}.csv" for name in ("sales", "factory")}
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def smtp_server(tmp_path):
+    server = LocalSMTPServer(str(tmp_path / "mail")).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "report_jobs.db")
+
+
+def job_rows(db_path):
+    conn = report_worker.connect(db_path)
+    try:
+        return {row['name']: dict(row) for row in conn.execute("SELECT * FROM report_jobs")}
+    finally:
+        conn.close()
+
+
+def test_send_now_requests_collapse_per_recipient(db_path):
+    for recipient in ("a@example.com", "a@example.com", "b@example.com", "a@example.com"):
+        report_worker.enqueue_send(db_path, recipient)
+
+    assert sorted(job_rows(db_path)) == ["once:a@example.com", "once:b@example.com"]
+
+
+def test_weekly_jobs_are_keyed_by_name(db_path):
+    report_worker.upsert_weekly_job(db_path, "weekly", "a@example.com", "monday", "08:00")
+    # The worker registers its defaults with replace=False, so they never override an edited job
+    report_worker.upsert_weekly_job(db_path, "weekly", "b@example.com", "friday", "09:30", replace=False)
+    assert job_rows(db_path)["weekly"]['recipient'] == "a@example.com"
+
+    report_worker.upsert_weekly_job(db_path, "weekly", "c@example.com", "friday", "09:30")
+    rows = job_rows(db_path)
+    assert list(rows) == ["weekly"]
+    assert (rows["weekly"]['recipient'], rows["weekly"]['weekday'], rows["weekly"]['at_time']) == ("c@example.com", 4, "09:30")
+
+
+def test_each_due_job_is_claimed_by_one_worker(db_path):
+    for index in range(20):
+        report_worker.enqueue_send(db_path, f"user{index}@example.com")
+    start = threading.Barrier(4)
+    claimed = {}
+
+    def claim(worker_id):
+        conn = report_worker.connect(db_path)
+        try:
+            start.wait()
+            claimed[worker_id] = [job['name'] for job in report_worker.claim_due_jobs(conn, worker_id)]
+        finally:
+            conn.close()
+
+    threads = [threading.Thread(target=claim, args=(f"worker-{index}",)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    names = [name for jobs in claimed.values() for name in jobs]
+    assert len(names) == 20 and len(set(names)) == 20
+    assert {row['claimed_by'] for row in job_rows(db_path).values()} <= set(claimed)
+
+
+def test_jobs_are_rendered_and_delivered_through_smtp(db_path, sheet_sources, smtp_server, tmp_path):
+    report_worker.upsert_weekly_job(db_path, "weekly", "boss@example.com", "monday", "08:00")
+    report_worker.enqueue_send(db_path, "a@example.com")
+    report_worker.enqueue_send(db_path, "a@example.com")
+    report_worker.enqueue_send(db_path, "b@example.com")
+
+    transport = SmtpTransport("127.0.0.1", smtp_server.port, starttls=False, timeout=5)
+    renderer = report_worker.ReportRenderer(sheet_sources, cache_dir=str(tmp_path / "reports"))
+    processed = report_worker.run_pending(db_path, transport, renderer, "reports@localhost", "worker-1", now=LATER)
+
+    assert processed == 3
+    assert sorted(recipient for recipients, _ in smtp_server.messages for recipient in recipients) == [
+        "a@example.com", "b@example.com", "boss@example.com"]
+    for _, path in smtp_server.messages:
+        with open(path, "rb") as f:
+            message = email.message_from_bytes(f.read())
+        attachment = [part for part in message.walk() if part.get_filename() == "inventory_report.pdf"]
+        assert attachment and attachment[0].get_payload(decode=True).startswith(b"%PDF")
+    # One render serves every job due for the same snapshot
+    assert len(list((tmp_path / "reports").iterdir())) == 1
+
+    # One-off jobs are gone; the weekly job is released and rescheduled
+    rows = job_rows(db_path)
+    assert list(rows) == ["weekly"]
+    assert rows["weekly"]['last_status'] == "sent"
+    assert rows["weekly"]['claimed_by'] is None
+    assert rows["weekly"]['next_run'] > LATER
+
+    # Nothing is due again, so a second pass sends nothing
+    assert report_worker.run_pending(db_path, transport, renderer, "reports@localhost", "worker-1", now=LATER) == 0
+    assert len(smtp_server.messages) == 3
+
+
+def test_failed_delivery_is_released_for_a_retry(db_path, sheet_sources, tmp_path):
+    report_worker.enqueue_send(db_path, "a@example.com")
+
+    class BrokenTransport:
+        def send(self, message):
+            raise ConnectionRefusedError("relay down")
+
+    renderer = report_worker.ReportRenderer(sheet_sources, cache_dir=str(tmp_path / "reports"))
+    assert report_worker.run_pending(db_path, BrokenTransport(), renderer, "reports@localhost", now=LATER) == 1
+
+    job = job_rows(db_path)["once:a@example.com"]
+    assert job['attempts'] == 1
+    assert job['claimed_by'] is None
+    assert job['last_status'].startswith("error: relay down")
+    assert job['next_run'] == pytest.approx(LATER + report_worker.RETRY_DELAY_SECONDS)
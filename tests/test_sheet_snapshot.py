@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""SnapshotCache against a local HTTP server standing in for the Google Sheets CSV export."""
+
+import functools
+import http.server
+import os
+import threading
+import time
+
+import pytest
+
+from sheet_snapshot import Snapshot, SnapshotCache, make_session
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    """Serves the temp directory and counts the requests that got a body."""
+
+    full_responses = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_response(self, code, message=None):
+        if code == 200:
+            type(self).full_responses += 1
+        super().send_response(code, message)
+
+
+@pytest.fixture
+def sheet_server(tmp_path):
+    handler = type("Handler", (QuietHandler,), {"full_responses": 0})
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(handler, directory=str(tmp_path)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield tmp_path, f"http://127.0.0.1:{server.server_address[1]}", handler
+    server.shutdown()
+    server.server_close()
+
+
+# Function to (re)write a served CSV, moving its mtime forward so Last-Modified changes
+def write_sheet(path, text, mtime=None):
+    path.write_text(text)
+    mtime = mtime or time.time() + 10
+    os.utime(path, (mtime, mtime))
+
+
+def make_cache(base_url):
+    sources = {"sales": f"{base_url}/sales.csv", "factory": f"{base_url}/factory.csv"}
+    return SnapshotCache(sources, timeout=5, session=make_session(retries=0))
+
+
+def test_first_get_loads_every_sheet(sheet_server):
+    directory, base_url, _ = sheet_server
+    write_sheet(directory / "sales.csv", "code,weight\nA1,1.5\n")
+    write_sheet(directory / "factory.csv", "code,weight\nB2,2.5\n")
+
+    cache = make_cache(base_url)
+    snapshot = cache.get()
+
+    assert list(snapshot.frames["sales"]["code"]) == ["A1"]
+    assert list(snapshot.frames["factory"]["weight"]) == [2.5]
+    assert cache.get() is snapshot
+
+
+def test_not_modified_keeps_the_snapshot(sheet_server):
+    directory, base_url, handler = sheet_server
+    write_sheet(directory / "sales.csv", "code,weight\nA1,1.5\n")
+    write_sheet(directory / "factory.csv", "code,weight\nB2,2.5\n")
+    cache = make_cache(base_url)
+    snapshot = cache.refresh()
+    served = handler.full_responses
+
+    # http.server answers If-Modified-Since with 304 while the files are unchanged
+    assert cache.refresh() is snapshot
+    assert handler.full_responses == served
+
+
+def test_same_content_keeps_the_snapshot(sheet_server):
+    directory, base_url, handler = sheet_server
+    write_sheet(directory / "sales.csv", "code,weight\nA1,1.5\n")
+    write_sheet(directory / "factory.csv", "code,weight\nB2,2.5\n")
+    cache = make_cache(base_url)
+    snapshot = cache.refresh()
+
+    # A newer mtime defeats the conditional request; the content hash still matches
+    write_sheet(directory / "sales.csv", "code,weight\nA1,1.5\n", mtime=time.time() + 100)
+    served = handler.full_responses
+    assert cache.refresh() is snapshot
+    assert handler.full_responses == served + 1
+
+
+def test_changed_content_publishes_a_new_snapshot(sheet_server):
+    directory, base_url, _ = sheet_server
+    write_sheet(directory / "sales.csv", "code,weight\nA1,1.5\n")
+    write_sheet(directory / "factory.csv", "code,weight\nB2,2.5\n")
+    cache = make_cache(base_url)
+    snapshot = cache.refresh()
+    snapshot.derive("rows", lambda: 1)
+
+    write_sheet(directory / "sales.csv", "code,weight\nA1,1.5\nC3,4.0\n", mtime=time.time() + 100)
+    fresh = cache.refresh()
+
+    assert fresh is not snapshot
+    assert fresh.version != snapshot.version
+    assert list(fresh.frames["sales"]["code"]) == ["A1", "C3"]
+    # The unchanged sheet is reused, and derived values start over
+    assert fresh.frames["factory"] is snapshot.frames["factory"]
+    assert fresh.derived == {}
+
+
+def test_http_error_keeps_the_old_snapshot(sheet_server):
+    directory, base_url, _ = sheet_server
+    write_sheet(directory / "sales.csv", "code,weight\nA1,1.5\n")
+    write_sheet(directory / "factory.csv", "code,weight\nB2,2.5\n")
+    cache = make_cache(base_url)
+    snapshot = cache.refresh()
+
+    os.remove(directory / "factory.csv")
+    write_sheet(directory / "sales.csv", "code,weight\nZ9,9.0\n", mtime=time.time() + 100)
+    cache._safe_refresh()
+
+    assert cache.snapshot is snapshot
+    assert "404" in str(cache.last_error)
+
+    # Nothing from the failed refresh was committed: once the sheet is back, the new content is published
+    write_sheet(directory / "factory.csv", "code,weight\nB2,2.5\n")
+    fresh = cache.refresh()
+    assert fresh is not snapshot
+    assert list(fresh.frames["sales"]["code"]) == ["Z9"]
+    assert cache.last_error is None
+
+
+def test_derive_builds_once_for_concurrent_callers():
+    snapshot = Snapshot(version="v", frames={}, fetched_at=time.time())
+    builds = []
+    start = threading.Barrier(8)
+
+    def build():
+        builds.append(1)
+        time.sleep(0.2)
+        return "value"
+
+    def call():
+        start.wait()
+        return snapshot.derive("key", build)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(call())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["value"] * 8
+    assert len(builds) == 1
+
+
+def test_derive_may_call_derive():
+    snapshot = Snapshot(version="v", frames={}, fetched_at=time.time())
+    inner = snapshot.derive("outer", lambda: snapshot.derive("inner", lambda: 1) + 1)
+    assert inner == 2
+    assert snapshot.derived == {"inner": 1, "outer": 2}
+
+
+def test_failed_derive_is_not_memoized():
+    snapshot = Snapshot(version="v", frames={}, fetched_at=time.time())
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        snapshot.derive("key", fail)
+    assert snapshot.derive("key", lambda: 3) == 3
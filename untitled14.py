@@ -12,6 +12,10 @@ https://colab.research.google.com/drive/1aHPwHTOHyDChtT8tTnmoHPKD_f39w-iK
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+from sheet_snapshot import fetch_csv_frames
+from categorize import design_prefix
+from aged_stock import AgedStockIndex
+from inventory_metrics import InventoryMetrics
 
 # Google Sheets Information
 GOOGLE_SHEET_URL = "https://docs.google.com/spreadsheets/d/1Jwx4TntDxlwghFn_eC_NgooXlpvR6WTDdvWy4PO0zgk/export?format=csv&gid="
@@ -21,26 +25,53 @@ SHEET_IDS = {
     "factory_inventory": "0"  # GID for factory inventory
 }
 
-# Function to Load Data from Google Sheets
+# Function to prepare a downloaded sheet
+def prepare_sheet(name, df):
+    df.dropna(how='all', inplace=True)  # Remove empty rows
+    
+    if 'DATE' in df.columns:
+        df['DATE'] = pd.to_datetime(df['DATE'], errors='coerce')  # Ensure DATE is datetime
+    
+    if 'DESIGN NO' in df.columns:
+        df['Category'] = design_prefix(df['DESIGN NO'])  # Prefix before the first '-', vectorized
+    else:
+        df['Category'] = 'Unknown'
+    
+    return df
+
+# Function to fall back to an empty frame for a sheet that failed to load (runs in a fetch thread)
+def sheet_load_error(name, error):
+    df = pd.DataFrame()
+    df.attrs['load_error'] = str(error)
+    return df
+
+# Function to Load every sheet in SHEET_IDS from Google Sheets concurrently
 @st.cache_data
+def load_all_data():
+    urls = {name: GOOGLE_SHEET_URL + gid for name, gid in SHEET_IDS.items()}
+    return fetch_csv_frames(urls, parse=prepare_sheet, on_error=sheet_load_error)
+
+# Function to Load Data for one sheet
 def load_data(sheet_gid):
-    try:
-        url = GOOGLE_SHEET_URL + sheet_gid
-        df = pd.read_csv(url)
-        df.dropna(how='all', inplace=True)  # Remove empty rows
-        
-        if 'DATE' in df.columns:
-            df['DATE'] = pd.to_datetime(df['DATE'], errors='coerce')  # Ensure DATE is datetime
-        
-        if 'DESIGN NO' in df.columns:
-            df['Category'] = df['DESIGN NO'].apply(lambda x: x.split('-')[0] if pd.notna(x) else 'Unknown')
-        else:
-            df['Category'] = 'Unknown'
-        
-        return df
-    except Exception as e:
-        st.error(f"Error loading data: {e}")
-        return pd.DataFrame()
+    name = next(name for name, gid in SHEET_IDS.items() if gid == sheet_gid)
+    df = load_all_data()[name]
+    if df.attrs.get('load_error'):
+        st.error(f"Error loading data: {df.attrs['load_error']}")
+    return df
+
+# Function to build the date-sorted aged-stock index over the overall inventory (once per data load)
+@st.cache_resource
+def load_aged_index():
+    data = load_all_data()
+    overall_inventory = pd.concat([data['salesperson_inventory'], data['factory_inventory']], ignore_index=True)
+    if 'DATE' not in overall_inventory.columns:
+        return None
+    return AgedStockIndex(overall_inventory, category_column='Category', exclude_delivered=False)
+
+# Function to materialize the dashboard KPIs once per data load
+@st.cache_resource
+def load_metrics():
+    return InventoryMetrics(load_all_data(), category_column='Category')
 
 # Load data
 salesperson_inventory = load_data(SHEET_IDS['salesperson_inventory'])
@@ -50,6 +81,26 @@ factory_inventory = load_data(SHEET_IDS['factory_inventory'])
 st.sidebar.title("📦 Inventory Management")
 page = st.sidebar.radio("Navigation", ["Home", "Dashboard", "Salesperson Inventory", "Factory Inventory", "Overall Inventory", "Aged Stock"]).strip()
 
+# Function to render inventory pages
+def render_inventory_page(title, inventory_data):
+    st.title(title)
+    if inventory_data.empty:
+        st.warning("No data available.")
+        return
+    
+    st.subheader("🔍 Search & Filter")
+    search_term = st.text_input("Search by Design No", "").strip()
+    categories = inventory_data['Category'].dropna().unique() if 'Category' in inventory_data.columns else []
+    category_filter = st.selectbox("Filter by Category", ['All'] + list(categories))
+    
+    filtered_data = inventory_data.copy()
+    if category_filter != 'All' and 'Category' in filtered_data.columns:
+        filtered_data = filtered_data[filtered_data['Category'] == category_filter]
+    if search_term and 'DESIGN NO' in filtered_data.columns:
+        filtered_data = filtered_data[filtered_data['DESIGN NO'].astype(str).str.contains(search_term, case=False, na=False)]
+    
+    st.dataframe(filtered_data, use_container_width=True)
+
 # Home Page
 if page == "Home":
     st.title("🏠 Welcome to the Inventory Management App")
@@ -65,31 +116,31 @@ if page == "Home":
 elif page == "Dashboard":
     st.title("📈 Stock Inventory Dashboard")
 
-    df_sales = load_data(SHEET_IDS["salesperson_inventory"])
-    df_factory = load_data(SHEET_IDS["factory_inventory"])
+    df_sales = salesperson_inventory
+    df_factory = factory_inventory
 
     if not df_sales.empty and not df_factory.empty:
+        metrics = load_metrics()
+
         # Overall Inventory Statistics
-        total_pcs = df_sales["PCS"].sum() if "PCS" in df_sales.columns else 0
-        total_pcs += df_factory["PCS"].sum() if "PCS" in df_factory.columns else 0
-        total_wt = df_sales["WT"].sum() if "WT" in df_sales.columns else 0
-        total_wt += df_factory["WT"].sum() if "WT" in df_factory.columns else 0
+        total_pcs = metrics.total("PCS")
+        total_wt = metrics.total("WT")
         st.subheader("📊 Overall Inventory Statistics")
         col1, col2 = st.columns(2)
         col1.metric("📦 Total Pieces", total_pcs)
         col2.metric("⚖️ Total Weight", total_wt)
      
         # Salesperson Statistics
-        sales_pcs = df_sales["PCS"].sum() if "PCS" in df_sales.columns else 0
-        sales_wt = df_sales["WT"].sum() if "WT" in df_sales.columns else 0
+        sales_pcs = metrics.total("PCS", "salesperson_inventory")
+        sales_wt = metrics.total("WT", "salesperson_inventory")
         st.subheader("🧑‍💼 Salesperson Inventory Statistics")
         col3, col4 = st.columns(2)
         col3.metric("📦 Total Pieces (Salesperson)", sales_pcs)
         col4.metric("⚖️ Total Weight (Salesperson)", sales_wt)
      
         # Factory Inventory Statistics
-        factory_pcs = df_factory["PCS"].sum() if "PCS" in df_factory.columns else 0
-        factory_wt = df_factory["WT"].sum() if "WT" in df_factory.columns else 0
+        factory_pcs = metrics.total("PCS", "factory_inventory")
+        factory_wt = metrics.total("WT", "factory_inventory")
         st.subheader("🏭 Factory Inventory Statistics")
         col5, col6 = st.columns(2)
         col5.metric("📦 Total Pieces (Factory)", factory_pcs)
@@ -97,43 +148,23 @@ elif page == "Dashboard":
 
         # New Bar Chart: Overall Inventory Categories by Weight
         st.subheader("📊 Overall Inventory Categories by Weight")
-        combined_df = pd.concat([df_sales, df_factory], ignore_index=True)
-        if "Category" in combined_df.columns and "WT" in combined_df.columns:
-            category_wt = combined_df.groupby("Category")["WT"].sum().sort_values(ascending=False)
+        combined_columns = df_sales.columns.union(df_factory.columns)
+        if "Category" in combined_columns and "WT" in combined_columns:
+            category_wt = metrics.by_category("WT").sort_values(ascending=False)
             st.bar_chart(category_wt)
         else:
             st.warning("Category or WT column missing in data.")
 
         # Visualization: Stock Distribution Over Time
         st.subheader("📅 Stock Distribution Over Time")
-        if "DATE" in combined_df.columns and "PCS" in combined_df.columns:
-            stock_over_time = combined_df.groupby(combined_df["DATE"].dt.date)["PCS"].sum()
+        if "DATE" in combined_columns and "PCS" in combined_columns:
+            stock_over_time = metrics.over_time("PCS", by_day=True)
             st.line_chart(stock_over_time)
         else:
             st.warning("DATE or PCS column missing in data.")
     else:
         st.warning("⚠️ No data available! Please check your Google Sheet link.")
 
-# Function to render inventory pages
-def render_inventory_page(title, inventory_data):
-    st.title(title)
-    if inventory_data.empty:
-        st.warning("No data available.")
-        return
-    
-    st.subheader("🔍 Search & Filter")
-    search_term = st.text_input("Search by Design No", "").strip()
-    categories = inventory_data['Category'].dropna().unique() if 'Category' in inventory_data.columns else []
-    category_filter = st.selectbox("Filter by Category", ['All'] + list(categories))
-    
-    filtered_data = inventory_data.copy()
-    if category_filter != 'All' and 'Category' in filtered_data.columns:
-        filtered_data = filtered_data[filtered_data['Category'] == category_filter]
-    if search_term and 'DESIGN NO' in filtered_data.columns:
-        filtered_data = filtered_data[filtered_data['DESIGN NO'].astype(str).str.contains(search_term, case=False, na=False)]
-    
-    st.dataframe(filtered_data, use_container_width=True)
-
 # Ensure `elif` statements are correctly placed
 elif page == "Salesperson Inventory":
     render_inventory_page("👨‍💼 Salesperson Inventory", salesperson_inventory)
@@ -147,10 +178,11 @@ elif page == "Overall Inventory":
 
 elif page == "Aged Stock":
     st.title("📅 Aged Stock")
-    overall_inventory = pd.concat([salesperson_inventory, factory_inventory], ignore_index=True)
-    if 'DATE' in overall_inventory.columns:
+    aged_index = load_aged_index()
+    if aged_index is not None:
         days_threshold = st.slider("Select Aging Threshold (Days)", min_value=15, max_value=90, value=30, step=5)
-        aged_stock = overall_inventory[pd.Timestamp.today() - overall_inventory['DATE'] > pd.Timedelta(days=days_threshold)]
+        # Binary search on the pre-sorted dates instead of rescanning every row
+        aged_stock = aged_index.aged(days_threshold, now=pd.Timestamp.today(), whole_days=False, with_age=False)
         st.dataframe(aged_stock, use_container_width=True)
     else:
         st.warning("Date information not available.")
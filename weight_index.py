@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""Persistent Code -> (Category, Weight) lookup index for the weight sheet.
+
+The index is built once per weight-sheet content hash, saved as an Arrow file
+tagged with WEIGHT_INDEX_VERSION and reused across sessions.  Merging
+extracted codes becomes a vectorized hash lookup on the Code index instead of
+a full pandas merge.
+"""
+
+import os
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from data_loader import file_hash, load_uploaded_file, frame_cache
+
+INDEX_DIR = os.environ.get("WEIGHT_INDEX_DIR", ".weight_index")
+WEIGHT_INDEX_VERSION = 1
+REQUIRED_COLUMNS = ["Code", "Category", "Weight"]
+
+
+# Function to build the index file path for a weight sheet
+def index_path(digest, directory=INDEX_DIR):
+    return os.path.join(directory, f"{digest}-v{WEIGHT_INDEX_VERSION}.arrow")
+
+
+# Function to build the lookup table from a parsed weight sheet
+def build_index(weight_df):
+    weight_df = weight_df.rename(columns=lambda column: str(column).strip())
+    missing = [column for column in REQUIRED_COLUMNS if column not in weight_df.columns]
+    if missing:
+        raise ValueError(f"Weight sheet is missing columns: {missing}")
+    # A code listed twice keeps its first row so each code maps to exactly one weight
+    index = weight_df.drop_duplicates(subset="Code", keep="first").set_index("Code")
+    index.attrs["duplicate_codes"] = int(weight_df["Code"].duplicated().sum())
+    return index
+
+
+# Function to save an index atomically
+def save_index(index, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    table = pa.Table.from_pandas(index.reset_index(), preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        b"duplicate_codes": str(index.attrs.get("duplicate_codes", 0)).encode(),
+    })
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    os.close(fd)
+    try:
+        feather.write_feather(table, tmp_path, compression="uncompressed")
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# Function to read a saved index, returning None if it is missing
+def read_index(path):
+    try:
+        table = feather.read_table(path, memory_map=True)
+    except (FileNotFoundError, pa.ArrowInvalid):
+        return None
+    index = table.to_pandas().set_index("Code")
+    index.attrs["duplicate_codes"] = int((table.schema.metadata or {}).get(b"duplicate_codes", b"0"))
+    return index
+
+
+# Function to get the lookup index for an uploaded weight sheet, building it on first use
+def load_weight_index(weight_file, directory=INDEX_DIR):
+    digest = file_hash(weight_file)
+
+    def build():
+        path = index_path(digest, directory)
+        index = read_index(path)
+        if index is None:
+            index = build_index(load_uploaded_file(weight_file))
+            try:
+                save_index(index, path)
+            except (pa.ArrowException, OSError):
+                pass
+        return index
+
+    return frame_cache.get_or_create(("weight_index", digest, WEIGHT_INDEX_VERSION), build)
+
+
+# Function to attach weight-sheet columns to extracted codes with a vectorized lookup
+def merge_weights(extracted_df, index):
+    matched = index.reindex(extracted_df["Code"].values)
+    matched.index = extracted_df.index
+    return pd.concat([extracted_df, matched], axis=1)
+
+
+# Function to list the extracted codes that are not in the weight sheet
+def unmatched_report(extracted_df, index):
+    unmatched = extracted_df[~extracted_df["Code"].isin(index.index)]
+    return (
+        unmatched.groupby(["Party Name", "Code"]).size().reset_index(name="Count")
+        .sort_values(["Party Name", "Code"], ignore_index=True)
+    )